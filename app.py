@@ -1,21 +1,46 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import (Flask, render_template, request, redirect, url_for, session, flash, Response, stream_with_context,
+                   g, has_request_context, before_render_template, template_rendered, send_from_directory, abort)
+from flask.sessions import SessionInterface, SessionMixin
+from flask.json.tag import TaggedJSONSerializer
+from werkzeug.datastructures import CallbackDict
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
 import sqlite3
-from datetime import datetime
-from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from datetime import datetime, timedelta
+from itsdangerous import URLSafeTimedSerializer, URLSafeSerializer, BadSignature, SignatureExpired
 from sqlalchemy.exc import OperationalError
-from sqlalchemy import or_
-from functools import wraps
-import math
+from sqlalchemy import or_, func, case, insert, text, event, tuple_
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from functools import wraps, lru_cache
+from collections import OrderedDict, deque
 import time
+import threading
+import queue
+import atexit
+import warnings
 
 # Extras for CSV import
 import csv
 import io
 import json
 import uuid
+import bisect
+import re
+import random
+import cProfile
+import pstats
+import shutil
+import zlib
+import secrets
+from itertools import islice
+
+# NumPy powers batch scoring; fall back to the scalar path if it is unavailable
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 app = Flask(__name__)
 app.secret_key = "edupredict_secret_key"
@@ -24,29 +49,185 @@ app.secret_key = "edupredict_secret_key"
 # DATABASE CONFIG
 # =========================
 basedir = os.path.abspath(os.path.dirname(__file__))
-db_path = os.path.join(basedir, 'database.db')
-# Use absolute path to ensure the DB lives next to the app script
+# Use absolute path to ensure the DB lives next to the app script;
+# EDUPREDICT_DATABASE points the app at another file (used by the benchmarks)
+db_path = os.environ.get('EDUPREDICT_DATABASE') or os.path.join(basedir, 'database.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path.replace('\\', '/')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Connection pool sizing (each pooled connection keeps its own SQLite page cache)
+app.config['DB_POOL_SIZE'] = 10
+app.config['DB_MAX_OVERFLOW'] = 20
+app.config['DB_POOL_TIMEOUT'] = 30
+# Applied to every new SQLite connection: WAL lets readers run alongside the
+# single writer, NORMAL sync is safe under WAL, and the cache/mmap sizes keep
+# hot pages in memory (negative cache_size is in KiB).
+app.config['SQLITE_PRAGMAS'] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
 # Increase SQLite busy timeout to reduce 'database is locked' errors on Windows/OneDrive
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = { 'connect_args': { 'timeout': 30 } }
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'connect_args': { 'timeout': 30 },
+    'pool_size': app.config['DB_POOL_SIZE'],
+    'max_overflow': app.config['DB_MAX_OVERFLOW'],
+    'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+}
 # How long confirmation tokens are valid (seconds)
 app.config['CONFIRM_TOKEN_TTL'] = 600  # 10 minutes
-
-# Ensure instance confirm dir exists
-os.makedirs(os.path.join(app.instance_path, 'confirm'), exist_ok=True)
+# Expired confirmation tokens removed per create, oldest first (the rest wait for the next one)
+app.config['CONFIRM_EVICT_BATCH'] = 50
+# Rows per transaction when saving a CSV import
+app.config['IMPORT_CHUNK_SIZE'] = 500
+# Rows shown on the import preview page (the full upload is spooled to disk)
+app.config['IMPORT_PREVIEW_ROWS'] = 100
+# Rows per compressed chunk in a spooled import (a preview page decompresses one or two)
+app.config['IMPORT_STORE_CHUNK_ROWS'] = 1000
+# Seconds an unsaved import preview is kept before cleanup removes it
+app.config['IMPORT_SESSION_TTL'] = 24 * 60 * 60
+app.config['IMPORT_SWEEP_INTERVAL'] = 600
+# Seconds a filtered student count is reused (counts are also dropped on every write)
+app.config['STUDENT_COUNT_CACHE_TTL'] = 60
+# Section/subject filter lists, cached per owner (dropped on every student write)
+app.config['FACET_CACHE_TTL'] = 300
+app.config['FACET_CACHE_SIZE'] = 512
+# Students listed per page inside an expanded section on /sections
+app.config['SECTION_PAGE_SIZE'] = 25
+# Audit rows are queued and written in batches by a background thread
+app.config['AUDIT_BATCH_SIZE'] = 200
+app.config['AUDIT_FLUSH_INTERVAL'] = 1.0  # seconds
+app.config['AUDIT_QUEUE_SIZE'] = 10000
+# Audit log viewer page size
+app.config['AUDIT_PAGE_SIZE'] = 100
+# Audit rows older than this are moved to compressed archives by scripts/archive_audit_log.py
+app.config['AUDIT_RETENTION_DAYS'] = 365
+# Server-side sessions: the cookie only carries a random session ID.
+# 'sqlite' keeps sessions in the server_session table (shared across workers and
+# restarts); 'memory' keeps them in a per-process LRU.
+app.config['SESSION_BACKEND'] = 'sqlite'
+app.config['SESSION_TTL'] = 12 * 60 * 60  # idle seconds before a session expires
+app.config['SESSION_MEMORY_SIZE'] = 10000  # max sessions held by the memory backend
+app.config['SESSION_SWEEP_INTERVAL'] = 300  # seconds between expired-session sweeps
+# Per-endpoint latency/SQL/template metrics (shown on /admin/metrics and /metrics)
+app.config['METRICS_ENABLED'] = True
+# Upper bounds (seconds) of the request latency histogram buckets
+app.config['METRICS_LATENCY_BUCKETS'] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Bearer token that lets a scraper read /metrics without an Admin session (None: Admins only)
+app.config['METRICS_TOKEN'] = os.environ.get('EDUPREDICT_METRICS_TOKEN')
+# Slow-query log: statements at or over the threshold get an EXPLAIN QUERY PLAN and
+# a slot in a bounded ring buffer (see /admin/slow-queries)
+app.config['SLOW_QUERY_ENABLED'] = True
+app.config['SLOW_QUERY_THRESHOLD_MS'] = 100
+app.config['SLOW_QUERY_LOG_SIZE'] = 100
+# Distinct statement fingerprints tracked; further ones are counted under '<other>'
+app.config['SLOW_QUERY_MAX_FINGERPRINTS'] = 1000
+# Bound parameters of statements on these tables (session IDs/payloads, password
+# hashes, confirm payloads) are never stored in the slow-query samples
+app.config['SLOW_QUERY_REDACT_TABLES'] = ('server_session', 'user', 'confirm_token')
+# On-demand cProfile profiling (managed from /admin/profiling). Admins can profile a
+# single request with ?_profile=1 or an 'X-Profile: 1' header; PROFILE_ENDPOINTS are
+# profiled for every user at PROFILE_SAMPLE_RATE (0.0-1.0).
+app.config['PROFILE_ENDPOINTS'] = set()
+app.config['PROFILE_SAMPLE_RATE'] = 0.0
+app.config['PROFILE_MAX_FILES'] = 200  # oldest .pstats files beyond this are deleted
+
+# Trained dropout model written by train_model.py
+app.config['RISK_MODEL_PATH'] = os.path.join(basedir, 'model', 'risk_model.pkl')
 
 db = SQLAlchemy(app)
 
 # =========================
 # LOAD AI MODEL (lazy-loaded)
 # =========================
-# Model may require compiled libraries which can crash the server at import time.
-# Lazy-load it inside the predict route to avoid startup crashes.
-model = None
+# Model may require compiled libraries which can crash the server at import time,
+# so joblib/sklearn are only imported on first use. The loaded model is then kept
+# warm for the life of the process and reloaded when the pickle file changes.
+class RiskModelCache:
+    """Process-wide cache around the joblib risk model with load/inference timings."""
+
+    def __init__(self, path):
+        self.path = path
+        self._model = None
+        self._mtime = None
+        self._failed_mtime = None
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.load_seconds = None
+        self.batches = 0
+        self.rows = 0
+        self.inference_seconds = 0.0
+        self.last_batch_ms = None
+
+    def get(self):
+        """Return the loaded model, (re)loading it if the file's mtime changed."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return self._model
+        if mtime == self._mtime or mtime == self._failed_mtime:
+            return self._model
+        with self._lock:
+            if mtime != self._mtime and mtime != self._failed_mtime:
+                started = time.perf_counter()
+                try:
+                    import joblib
+                    self._model = joblib.load(self.path)
+                except Exception:
+                    self._failed_mtime = mtime
+                    app.logger.exception('Failed to load risk model from %s', self.path)
+                    return self._model
+                self._mtime = mtime
+                self.loads += 1
+                self.load_seconds = time.perf_counter() - started
+                app.logger.info('Loaded risk model from %s in %.3fs', self.path, self.load_seconds)
+        return self._model
+
+    def predict_proba(self, attendance, final_grade):
+        """Dropout probabilities for paired attendance/final grade sequences.
+
+        Returns a list of floats, or None if the model is unavailable.
+        """
+        model = self.get()
+        if model is None or len(attendance) == 0:
+            return None
+        started = time.perf_counter()
+        X = [[a, g] for a, g in zip(attendance, final_grade)] if np is None else np.column_stack([attendance, final_grade])
+        try:
+            with warnings.catch_warnings():
+                # Trained on a DataFrame; plain arrays are fine for inference
+                warnings.filterwarnings('ignore', message='X does not have valid feature names')
+                proba = model.predict_proba(X)[:, 1]
+        except Exception:
+            app.logger.exception('Risk model inference failed')
+            return None
+        elapsed = time.perf_counter() - started
+        self.batches += 1
+        self.rows += len(proba)
+        self.inference_seconds += elapsed
+        self.last_batch_ms = elapsed * 1000
+        return [round(float(p), 4) for p in proba]
+
+    def metrics(self):
+        return {
+            'loaded': self._model is not None,
+            'loads': self.loads,
+            'load_seconds': self.load_seconds,
+            'batches': self.batches,
+            'rows': self.rows,
+            'inference_seconds': self.inference_seconds,
+            'last_batch_ms': self.last_batch_ms,
+        }
+
+
+risk_model = RiskModelCache(app.config['RISK_MODEL_PATH'])
 
 # Serializer for password reset tokens
 serializer = URLSafeTimedSerializer(app.secret_key)
+# Signed, opaque cursors for keyset pagination
+cursor_serializer = URLSafeSerializer(app.secret_key, salt='student-cursor')
+audit_cursor_serializer = URLSafeSerializer(app.secret_key, salt='audit-cursor')
 
 # =========================
 # DATABASE MODELS
@@ -76,10 +257,25 @@ class Student(db.Model):
     final_grade = db.Column(db.Float)
 
     risk = db.Column(db.String(50))
+    # Dropout probability from the trained model (None if the model is unavailable)
+    risk_score = db.Column(db.Float)
     added_by = db.Column(db.String(100))
     section = db.Column(db.String(100))
     subject = db.Column(db.String(50))
 
+    # Composite indexes matching the owner-scoped list/filter/facet queries.
+    # AUTOINCREMENT keeps SQLite from reusing a deleted student's id, which
+    # would merge two students' audit trails.
+    __table_args__ = (
+        db.Index('ix_student_added_by_id', 'added_by', 'id'),
+        db.Index('ix_student_added_by_section', 'added_by', 'section'),
+        db.Index('ix_student_added_by_subject', 'added_by', 'subject'),
+        db.Index('ix_student_added_by_risk', 'added_by', 'risk'),
+        db.Index('ix_student_section', 'section'),
+        db.Index('ix_student_subject', 'subject'),
+        {'sqlite_autoincrement': True},
+    )
+
 
 class Audit(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -88,33 +284,281 @@ class Audit(db.Model):
     student_id = db.Column(db.Integer)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     details = db.Column(db.Text)
+    changes = db.Column(db.Text)  # compact JSON {field: [old, new]} for the fields that changed
+
+    # Newest-first paging plus per-user/per-student/per-action history lookups
+    __table_args__ = (
+        db.Index('ix_audit_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_audit_user_timestamp', 'user', 'timestamp'),
+        db.Index('ix_audit_student_id_timestamp', 'student_id', 'timestamp'),
+        db.Index('ix_audit_action_timestamp', 'action', 'timestamp'),
+    )
 
     def __repr__(self):
         return f"<Audit {self.action} by {self.user} on {self.timestamp}>" 
 
-def add_role_column_if_missing():
-    """Add the 'role' column to the 'user' table if it doesn't exist."""
-    db_path = os.path.join(os.getcwd(), 'database.db')
-    if os.path.exists(db_path):
-        try:
-            conn = sqlite3.connect(db_path)
-            cur = conn.cursor()
-            cur.execute("PRAGMA table_info('user')")
-            cols = [row[1] for row in cur.fetchall()]
-            if 'role' not in cols:
-                app.logger.info("Adding 'role' column to 'user' table (runtime fallback).")
-                cur.execute("ALTER TABLE user ADD COLUMN role VARCHAR(20) DEFAULT 'Teacher'")
-                conn.commit()
-                # Refresh SQLAlchemy engine/session to pick up schema changes
-                try:
-                    db.session.remove()
-                    db.engine.dispose()
-                except Exception:
-                    pass
-        except Exception as e:
-            app.logger.exception('Runtime migration failed during role runtime migration')
-        finally:
-            conn.close()
+
+class AuditSummary(db.Model):
+    """Monthly per-user/per-action counts for audit rows that were archived out of the live table."""
+    __tablename__ = 'audit_summary'
+    period = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    user = db.Column(db.String(100), primary_key=True)
+    action = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    first_timestamp = db.Column(db.DateTime)
+    last_timestamp = db.Column(db.DateTime)
+
+
+class ServerSessionRecord(db.Model):
+    """Session data for the 'sqlite' session backend, keyed by the cookie's session ID."""
+    __tablename__ = 'server_session'
+    id = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    expires = db.Column(db.Float, nullable=False, index=True)  # unix time
+
+
+class ConfirmToken(db.Model):
+    """Pending confirmation payloads for the PRG confirm flow, looked up by token."""
+    __tablename__ = 'confirm_token'
+    token = db.Column(db.String(32), primary_key=True)
+    payload = db.Column(db.Text, nullable=False)
+    created = db.Column(db.Float, nullable=False)  # unix time
+    expires = db.Column(db.Float, nullable=False, index=True)  # unix time
+
+
+class StudentStats(db.Model):
+    """Per-owner/per-section summary of student counts (kept in sync on writes)."""
+    __tablename__ = 'student_stats'
+    added_by = db.Column(db.String(100), primary_key=True)
+    section = db.Column(db.String(100), primary_key=True)  # '' for unassigned
+    total = db.Column(db.Integer, nullable=False, default=0)
+    at_risk = db.Column(db.Integer, nullable=False, default=0)
+
+
+# =========================
+# GRADE / RISK SCORING
+# =========================
+# Final grade weights: WW 20%, PT 50%, Exam 30%; >=76 -> Low Risk, <=75 -> High Risk
+WW_WEIGHT = 0.20
+PT_WEIGHT = 0.50
+EXAM_WEIGHT = 0.30
+RISK_THRESHOLD = 76
+
+
+def score_student(activities, quizzes, performance_task, exam):
+    """Score a single student. Returns (written_works, final_grade, risk)."""
+    written_works = (activities + quizzes) / 2 if (activities or quizzes) else 0
+    final_grade = round(written_works * WW_WEIGHT + performance_task * PT_WEIGHT + exam * EXAM_WEIGHT, 2)
+    risk = 'Low Risk' if final_grade >= RISK_THRESHOLD else 'High Risk'
+    return written_works, final_grade, risk
+
+
+def score_batch(activities, quizzes, performance_task, exam):
+    """Score whole columns at once. Returns (written_works, final_grade, risk) lists.
+
+    Uses the same float operations as score_student, so both paths agree exactly.
+    """
+    if np is None:
+        scored = [score_student(*row) for row in zip(activities, quizzes, performance_task, exam)]
+        return [s[0] for s in scored], [s[1] for s in scored], [s[2] for s in scored]
+    activities = np.asarray(activities, dtype=float)
+    quizzes = np.asarray(quizzes, dtype=float)
+    performance_task = np.asarray(performance_task, dtype=float)
+    exam = np.asarray(exam, dtype=float)
+    written_works = (activities + quizzes) / 2
+    raw = written_works * WW_WEIGHT + performance_task * PT_WEIGHT + exam * EXAM_WEIGHT
+    final_grade = np.round(raw, 2)
+    # np.round scales by 100 first, which can differ from Python's round() on
+    # values sitting right at a half-cent; re-round just those with round().
+    cents = raw * 100
+    near_half = np.abs(cents - np.floor(cents) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        final_grade[i] = round(float(raw[i]), 2)
+    risk = np.where(final_grade >= RISK_THRESHOLD, 'Low Risk', 'High Risk')
+    return written_works.tolist(), final_grade.tolist(), risk.tolist()
+
+
+# =========================
+# SCHEMA MIGRATIONS
+# =========================
+# Schema changes for databases created by older versions of the app. They run
+# once, at startup or via `flask --app app migrate`, and each applied version is
+# recorded in the schema_migrations table. Request handlers never touch the schema.
+def _table_columns(conn, table):
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info('{table}')")}
+
+
+def _add_missing_columns(conn, table, columns):
+    existing = _table_columns(conn, table)
+    for col, sql_type in columns.items():
+        if col not in existing:
+            app.logger.info("Adding '%s' column to '%s' table.", col, table)
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {col} {sql_type}")
+
+
+def _migrate_user_role(conn):
+    _add_missing_columns(conn, 'user', {'role': "VARCHAR(20) DEFAULT 'Teacher'"})
+
+
+def _migrate_student_assessment_columns(conn):
+    _add_missing_columns(conn, 'student', {
+        'activities': "REAL DEFAULT 0",
+        'quizzes': "REAL DEFAULT 0",
+        'notes': "TEXT DEFAULT ''",
+        'written_works': "REAL DEFAULT 0",
+        'performance_task': "REAL DEFAULT 0",
+        'exam': "REAL DEFAULT 0",
+        'final_grade': "REAL DEFAULT 0",
+        'section': "TEXT DEFAULT ''",
+        'subject': "TEXT DEFAULT ''",
+    })
+
+
+def _migrate_student_risk_score(conn):
+    _add_missing_columns(conn, 'student', {'risk_score': "REAL"})
+
+
+def _migrate_audit_changes(conn):
+    _add_missing_columns(conn, 'audit', {'changes': "TEXT"})
+
+
+def _create_indexes(*ddl):
+    """Migration that runs fixed CREATE INDEX statements (frozen at the version that added them)."""
+    def migrate(conn):
+        for statement in ddl:
+            conn.exec_driver_sql(statement)
+    return migrate
+
+
+# Student filter indexes as of migration 4
+STUDENT_INDEXES_V4 = (
+    "CREATE INDEX IF NOT EXISTS ix_student_added_by_id ON student (added_by, id)",
+    "CREATE INDEX IF NOT EXISTS ix_student_added_by_section ON student (added_by, section)",
+    "CREATE INDEX IF NOT EXISTS ix_student_added_by_subject ON student (added_by, subject)",
+    "CREATE INDEX IF NOT EXISTS ix_student_added_by_risk ON student (added_by, risk)",
+    "CREATE INDEX IF NOT EXISTS ix_student_section ON student (section)",
+    "CREATE INDEX IF NOT EXISTS ix_student_subject ON student (subject)",
+)
+
+# Audit indexes as of migration 5
+AUDIT_INDEXES_V5 = (
+    "CREATE INDEX IF NOT EXISTS ix_audit_timestamp_id ON audit (timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_user_timestamp ON audit (user, timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_student_id_timestamp ON audit (student_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_action_timestamp ON audit (action, timestamp)",
+)
+
+
+# (version, description, function) in the order they must be applied
+# Student table as of migration 7
+STUDENT_COLUMNS_V7 = ('id', 'name', 'attendance', 'grade', 'activities', 'quizzes', 'notes', 'written_works',
+                      'performance_task', 'exam', 'final_grade', 'risk', 'risk_score', 'added_by', 'section', 'subject')
+STUDENT_TABLE_V7 = (
+    "CREATE TABLE student_v7 ("
+    "id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, name VARCHAR(100), attendance FLOAT, grade FLOAT, "
+    "activities FLOAT, quizzes FLOAT, notes TEXT, written_works FLOAT, performance_task FLOAT, exam FLOAT, "
+    "final_grade FLOAT, risk VARCHAR(50), risk_score FLOAT, added_by VARCHAR(100), section VARCHAR(100), "
+    "subject VARCHAR(50))"
+)
+
+
+def _migrate_student_autoincrement(conn):
+    """Rebuild student with AUTOINCREMENT so deleted ids are never handed out again.
+
+    SQLite cannot add AUTOINCREMENT in place, so the rows are copied into a new
+    table. The sequence starts past every id the audit log has seen, which
+    also covers students deleted before this migration.
+    """
+    row = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'student'").first()
+    if row is not None and 'AUTOINCREMENT' not in row[0].upper():
+        app.logger.info("Rebuilding 'student' table with AUTOINCREMENT.")
+        cols = ', '.join(STUDENT_COLUMNS_V7)
+        conn.exec_driver_sql(STUDENT_TABLE_V7)
+        conn.exec_driver_sql(f"INSERT INTO student_v7 ({cols}) SELECT {cols} FROM student")
+        conn.exec_driver_sql("DROP TABLE student")
+        conn.exec_driver_sql("ALTER TABLE student_v7 RENAME TO student")
+        for statement in STUDENT_INDEXES_V4:
+            conn.exec_driver_sql(statement)
+    high = conn.exec_driver_sql(
+        "SELECT MAX(COALESCE((SELECT MAX(id) FROM student), 0), COALESCE((SELECT MAX(student_id) FROM audit), 0))"
+    ).scalar()
+    if conn.exec_driver_sql("SELECT 1 FROM sqlite_sequence WHERE name = 'student'").first():
+        conn.exec_driver_sql("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'student'", (high,))
+    elif high:
+        conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('student', ?)", (high,))
+
+
+def _migrate_backfill_student_stats(conn):
+    """Fill student_stats from the student table (databases that predate the summary)."""
+    conn.exec_driver_sql("DELETE FROM student_stats")
+    conn.exec_driver_sql(
+        "INSERT INTO student_stats (added_by, section, total, at_risk) "
+        "SELECT COALESCE(added_by, ''), COALESCE(section, ''), COUNT(id), "
+        "COALESCE(SUM(CASE WHEN risk = 'High Risk' THEN 1 ELSE 0 END), 0) "
+        "FROM student GROUP BY COALESCE(added_by, ''), COALESCE(section, '')"
+    )
+
+
+MIGRATIONS = [
+    (1, "add user.role", _migrate_user_role),
+    (2, "add student assessment columns", _migrate_student_assessment_columns),
+    (3, "add student.risk_score", _migrate_student_risk_score),
+    (4, "add student filter indexes", _create_indexes(*STUDENT_INDEXES_V4)),
+    (5, "add audit indexes", _create_indexes(*AUDIT_INDEXES_V5)),
+    (6, "add audit.changes", _migrate_audit_changes),
+    (7, "student ids autoincrement", _migrate_student_autoincrement),
+    (8, "backfill student_stats", _migrate_backfill_student_stats),
+]
+
+
+def run_migrations():
+    """Apply any pending MIGRATIONS in one transaction. Returns the versions applied."""
+    applied_now = []
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at DATETIME NOT NULL)"
+        )
+        applied = {row[0] for row in conn.exec_driver_sql("SELECT version FROM schema_migrations")}
+        for version, name, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            app.logger.info('Applying schema migration %d: %s', version, name)
+            migrate(conn)
+            conn.exec_driver_sql(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, datetime.utcnow().isoformat(' '))
+            )
+            applied_now.append(version)
+    return applied_now
+
+
+def init_db():
+    """Create missing tables, then bring existing ones up to the current schema version."""
+    db.create_all()
+    return run_migrations()
+
+
+def clear_all_tables():
+    """Delete every row from every model table (schema_migrations is kept).
+
+    Returns {table name: rows deleted}. The caller commits.
+    """
+    deleted = {}
+    for table in reversed(db.metadata.sorted_tables):
+        deleted[table.name] = db.session.execute(table.delete()).rowcount
+    return deleted
+
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Create tables and apply pending schema migrations."""
+    applied = init_db()
+    if applied:
+        print('Applied migrations:', ', '.join(str(v) for v in applied))
+    else:
+        print('Schema is up to date.')
+
 
 # -----------------
 # PASSWORD RESET
@@ -134,8 +578,40 @@ def verify_reset_token(token, max_age=3600):
         return None
 
 
-def ensure_student_columns():
-    pass
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS to each new SQLite connection."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cur = dbapi_connection.cursor()
+    try:
+        for name, value in app.config.get('SQLITE_PRAGMAS', {}).items():
+            cur.execute(f"PRAGMA {name}={value}")
+    finally:
+        cur.close()
+
+
+# Commit/lock counters maintained by commit_with_retry
+commit_metrics = {'commits': 0, 'lock_retries': 0, 'lock_failures': 0}
+_commit_metrics_lock = threading.Lock()
+
+
+def _count_commit_event(name):
+    with _commit_metrics_lock:
+        commit_metrics[name] += 1
+    if name == 'lock_retries' and has_request_context():
+        g.metrics_lock_retries = g.get('metrics_lock_retries', 0) + 1
+
+
+def db_metrics():
+    """Commit/lock-retry counters, pool status and the effective SQLite pragmas."""
+    with db.engine.connect() as conn:
+        pragmas = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in app.config.get('SQLITE_PRAGMAS', {})}
+    return {
+        'commits': dict(commit_metrics),
+        'pool': db.engine.pool.status(),
+        'pragmas': pragmas,
+    }
 
 
 # Helper: commit with retry on SQLite 'database is locked' errors
@@ -146,10 +622,12 @@ def commit_with_retry(max_retries=6, initial_delay=0.05):
     for i in range(max_retries):
         try:
             db.session.commit()
+            _count_commit_event('commits')
             return
         except OperationalError as e:
             # SQLite 'database is locked' message
             if 'database is locked' in str(e).lower():
+                _count_commit_event('lock_retries')
                 sleep_time = initial_delay * (i + 1)
                 app.logger.warning('Database locked, retrying commit after %.3fs (attempt %d/%d)', sleep_time, i+1, max_retries)
                 time.sleep(sleep_time)
@@ -157,101 +635,1171 @@ def commit_with_retry(max_retries=6, initial_delay=0.05):
             # For other SQLAlchemy OperationalErrors, re-raise
             db.session.rollback()
             raise
+    _count_commit_event('lock_failures')
     db.session.rollback()
-    raise OperationalError('Database locked after retries')
+    raise OperationalError('COMMIT', None, sqlite3.OperationalError('database is locked after retries'))
+
+# ----- Request instrumentation -----
+class EndpointMetrics:
+    """Latency histogram and SQL/template totals for one endpoint."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.sql_statements = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.lock_retries = 0
+
+    def quantile(self, q):
+        """Estimate a latency quantile as the upper bound of the bucket that holds it."""
+        if not self.requests:
+            return None
+        rank, seen = q * self.requests, 0
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max_seconds
+
+
+class RequestMetrics:
+    """Process-wide per-endpoint request metrics, updated once per request."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, status, seconds, sql_statements, db_seconds, template_seconds, lock_retries):
+        with self._lock:
+            m = self._endpoints.get(endpoint)
+            if m is None:
+                m = self._endpoints[endpoint] = EndpointMetrics(self.buckets)
+            m.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            m.requests += 1
+            m.errors += status >= 500
+            m.seconds += seconds
+            m.max_seconds = max(m.max_seconds, seconds)
+            m.sql_statements += sql_statements
+            m.db_seconds += db_seconds
+            m.template_seconds += template_seconds
+            m.lock_retries += lock_retries
+
+    def snapshot(self):
+        """Per-endpoint summaries, slowest total time first."""
+        with self._lock:
+            items = list(self._endpoints.items())
+        rows = []
+        for endpoint, m in items:
+            n = m.requests or 1
+            rows.append({
+                'endpoint': endpoint, 'requests': m.requests, 'errors': m.errors,
+                'mean_ms': m.seconds / n * 1000, 'p50_ms': m.quantile(0.5) * 1000, 'p95_ms': m.quantile(0.95) * 1000,
+                'p99_ms': m.quantile(0.99) * 1000, 'max_ms': m.max_seconds * 1000,
+                'sql_per_request': m.sql_statements / n, 'db_ms_per_request': m.db_seconds / n * 1000,
+                'template_ms_per_request': m.template_seconds / n * 1000, 'lock_retries': m.lock_retries,
+                'total_seconds': m.seconds,
+            })
+        return sorted(rows, key=lambda r: r['total_seconds'], reverse=True)
 
-def ensure_student_columns():
-    """Ensure assessment-related columns exist on the student table."""
-    db_path = os.path.join(os.getcwd(), 'database.db')
-    cols_to_add = {
-        'activities': "REAL DEFAULT 0",
-        'quizzes': "REAL DEFAULT 0",
-        'notes': "TEXT DEFAULT ''",
-        'written_works': "REAL DEFAULT 0",
-        'performance_task': "REAL DEFAULT 0",
-        'exam': "REAL DEFAULT 0",
-        'final_grade': "REAL DEFAULT 0",
-        'section': "TEXT DEFAULT ''",
-        'subject': "TEXT DEFAULT ''"
-    }
-    if os.path.exists(db_path):
+    def histograms(self):
+        with self._lock:
+            return {endpoint: (list(m.bucket_counts), m.requests, m.seconds, m.errors, m.sql_statements,
+                               m.db_seconds, m.template_seconds, m.lock_retries)
+                    for endpoint, m in self._endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+request_metrics = RequestMetrics(app.config['METRICS_LATENCY_BUCKETS'])
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _sql_timer_start(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_start'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _sql_timer_stop(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop('query_start', time.perf_counter())
+    in_request = has_request_context()
+    # Only statements issued while serving a request (not the audit writer thread)
+    if in_request and 'metrics_start' in g:
+        g.metrics_sql += 1
+        g.metrics_db += elapsed
+    if app.config['SLOW_QUERY_ENABLED']:
+        slow_query_log.record(statement, parameters, elapsed, executemany, cursor,
+                              request.endpoint if in_request else None)
+
+
+@before_render_template.connect_via(app)
+def _template_timer_start(sender, template, context, **extra):
+    if 'metrics_start' in g:
+        g.metrics_template_start = time.perf_counter()
+
+
+@template_rendered.connect_via(app)
+def _template_timer_stop(sender, template, context, **extra):
+    started = g.pop('metrics_template_start', None)
+    if started is not None:
+        g.metrics_template += time.perf_counter() - started
+
+
+@app.before_request
+def _start_request_metrics():
+    if app.config['METRICS_ENABLED']:
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql = 0
+        g.metrics_db = 0.0
+        g.metrics_template = 0.0
+
+
+@app.after_request
+def _record_request_metrics(response):
+    started = g.pop('metrics_start', None)
+    if started is not None and request.endpoint != 'static':
+        # Streamed bodies are produced after this point; their time is not included
+        request_metrics.observe(request.endpoint or 'unmatched', response.status_code,
+                                time.perf_counter() - started, g.metrics_sql, g.metrics_db,
+                                g.metrics_template, g.get('metrics_lock_retries', 0))
+    return response
+
+
+def _prom_escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_metrics():
+    """Render request, database, cache, audit and model metrics in Prometheus text format."""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f'# HELP edupredict_{name} {help_text}')
+        lines.append(f'# TYPE edupredict_{name} {kind}')
+        for labels, value in samples:
+            label_text = ','.join(f'{k}="{_prom_escape(v)}"' for k, v in labels.items())
+            lines.append(f'edupredict_{name}{{{label_text}}} {value}' if label_text else f'edupredict_{name} {value}')
+
+    hists = request_metrics.histograms()
+    lines.append('# HELP edupredict_request_duration_seconds Request latency by endpoint.')
+    lines.append('# TYPE edupredict_request_duration_seconds histogram')
+    for endpoint, (counts, n, total, *_rest) in sorted(hists.items()):
+        ep = _prom_escape(endpoint)
+        cumulative = 0
+        for bound, count in zip(request_metrics.buckets, counts):
+            cumulative += count
+            lines.append(f'edupredict_request_duration_seconds_bucket{{endpoint="{ep}",le="{bound}"}} {cumulative}')
+        lines.append(f'edupredict_request_duration_seconds_bucket{{endpoint="{ep}",le="+Inf"}} {n}')
+        lines.append(f'edupredict_request_duration_seconds_sum{{endpoint="{ep}"}} {total}')
+        lines.append(f'edupredict_request_duration_seconds_count{{endpoint="{ep}"}} {n}')
+    per_endpoint = sorted(hists.items())
+    metric('request_errors_total', 'counter', 'Responses with a 5xx status.',
+           [({'endpoint': ep}, h[3]) for ep, h in per_endpoint])
+    metric('sql_statements_total', 'counter', 'SQL statements executed while serving requests.',
+           [({'endpoint': ep}, h[4]) for ep, h in per_endpoint])
+    metric('db_seconds_total', 'counter', 'Time spent executing SQL while serving requests.',
+           [({'endpoint': ep}, h[5]) for ep, h in per_endpoint])
+    metric('template_render_seconds_total', 'counter', 'Time spent rendering templates.',
+           [({'endpoint': ep}, h[6]) for ep, h in per_endpoint])
+    metric('request_lock_retries_total', 'counter', 'Commit retries after database is locked, by endpoint.',
+           [({'endpoint': ep}, h[7]) for ep, h in per_endpoint])
+
+    metric('commits_total', 'counter', 'Commits through commit_with_retry.', [({}, commit_metrics['commits'])])
+    metric('lock_retries_total', 'counter', 'Commit retries after database is locked.', [({}, commit_metrics['lock_retries'])])
+    metric('lock_failures_total', 'counter', 'Commits that gave up after retries.', [({}, commit_metrics['lock_failures'])])
+
+    caches = {'facet': facet_cache.stats(), 'count': count_cache.stats()}
+    metric('cache_hits_total', 'counter', 'In-process cache hits.', [({'cache': c}, s['hits']) for c, s in caches.items()])
+    metric('cache_misses_total', 'counter', 'In-process cache misses.', [({'cache': c}, s['misses']) for c, s in caches.items()])
+    metric('cache_entries', 'gauge', 'Entries held by in-process caches.', [({'cache': c}, s['size']) for c, s in caches.items()])
+
+    audit = audit_sink.stats()
+    metric('audit_queue_depth', 'gauge', 'Audit records waiting to be written.', [({}, audit['queue_depth'])])
+    metric('audit_records_total', 'counter', 'Audit records by outcome.',
+           [({'outcome': k}, audit[k]) for k in ('written', 'dropped', 'failed')])
+
+    model = risk_model.metrics()
+    metric('risk_model_loaded', 'gauge', 'Whether the risk model is loaded.', [({}, int(model['loaded']))])
+    metric('risk_model_rows_total', 'counter', 'Rows scored by the risk model.', [({}, model['rows'])])
+    metric('risk_model_inference_seconds_total', 'counter', 'Time spent in risk model inference.', [({}, model['inference_seconds'])])
+    return '\n'.join(lines) + '\n'
+
+
+# ----- Slow-query log -----
+_FP_STRING = re.compile(r"'(?:[^']|'')*'")
+_FP_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_FP_IN_LIST = re.compile(r'\bIN \((?:\s*\?\s*,)*\s*\?\s*\)', re.IGNORECASE)
+_FP_SPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def touches_tables(statement, tables):
+    """True if the statement reads or writes any of `tables` (FROM/JOIN/INTO/UPDATE targets)."""
+    names = '|'.join(re.escape(t) for t in tables)
+    return re.search(rf'\b(?:FROM|JOIN|INTO|UPDATE)\s+["`\[]?(?:{names})\b', statement, re.IGNORECASE) is not None
+
+
+@lru_cache(maxsize=2048)  # SQLAlchemy reuses the same statement strings
+def fingerprint_sql(statement):
+    """Normalize a statement so queries differing only in literals or IN-list length match."""
+    fp = _FP_STRING.sub('?', statement)
+    fp = _FP_NUMBER.sub('?', fp)
+    fp = _FP_IN_LIST.sub('IN (...)', fp)
+    return _FP_SPACE.sub(' ', fp).strip()
+
+
+class SlowQueryLog:
+    """Per-fingerprint count/total/max times plus a ring buffer of slow statements.
+
+    A statement at or over the threshold has its EXPLAIN QUERY PLAN captured on the
+    same connection (only when it is the slowest seen for its fingerprint, so a
+    repeatedly slow query is not re-explained every time).
+    """
+
+    def __init__(self, threshold_ms, size, max_fingerprints):
+        self.threshold = threshold_ms / 1000.0
+        self.max_fingerprints = max_fingerprints
+        self.samples = deque(maxlen=size)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement, parameters, seconds, executemany, cursor, endpoint):
+        fp = fingerprint_sql(statement)
+        with self._lock:
+            st = self._stats.get(fp)
+            if st is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    fp = '<other>'
+                st = self._stats.setdefault(fp, {'count': 0, 'total': 0.0, 'max': 0.0, 'slow': 0, 'plan': None})
+            st['count'] += 1
+            st['total'] += seconds
+            worst = seconds > st['max']
+            if worst:
+                st['max'] = seconds
+            if seconds < self.threshold:
+                return
+            st['slow'] += 1
+        plan = self._explain(cursor, statement, parameters) if worst and not executemany else None
+        if touches_tables(statement, tuple(app.config['SLOW_QUERY_REDACT_TABLES'])):
+            shown = '<redacted>'
+        else:
+            shown = repr(parameters)[:500]
+        with self._lock:
+            if plan is not None:
+                st['plan'] = plan
+            self.samples.append({
+                'at': datetime.utcnow().isoformat(timespec='seconds'), 'endpoint': endpoint, 'ms': seconds * 1000,
+                'fingerprint': fp, 'statement': statement, 'parameters': shown,
+                'plan': plan or st['plan'],
+            })
+
+    @staticmethod
+    def _explain(cursor, statement, parameters):
         try:
-            conn = sqlite3.connect(db_path)
-            cur = conn.cursor()
-            cur.execute("PRAGMA table_info('student')")
-            existing = [row[1] for row in cur.fetchall()]
-            for col, sql_type in cols_to_add.items():
-                if col not in existing:
-                    app.logger.info(f"Adding '{col}' column to 'student' table.")
-                    cur.execute(f"ALTER TABLE student ADD COLUMN {col} {sql_type}")
-                    conn.commit()
-            # Refresh SQLAlchemy engine/session to pick up schema changes
+            cur = cursor.connection.cursor()
             try:
-                db.session.remove()
-                db.engine.dispose()
-            except Exception:
-                pass
-        except Exception as e:
-            app.logger.exception('Student table migration failed during ensure_student_columns')
-        finally:
-            conn.close()
+                return [row[-1] for row in cur.execute('EXPLAIN QUERY PLAN ' + statement, parameters or ())]
+            finally:
+                cur.close()
+        except Exception:
+            return None
 
+    def fingerprints(self, limit=None):
+        """Fingerprint summaries, largest total time first."""
+        with self._lock:
+            rows = [{'fingerprint': fp, 'count': st['count'], 'total_ms': st['total'] * 1000,
+                     'mean_ms': st['total'] / st['count'] * 1000, 'max_ms': st['max'] * 1000,
+                     'slow': st['slow'], 'plan': st['plan']} for fp, st in self._stats.items()]
+        rows.sort(key=lambda r: r['total_ms'], reverse=True)
+        return rows[:limit] if limit else rows
 
-# ----- Confirmation session helpers (PRG flow) -----
-def cleanup_confirm_sessions(ttl_seconds=None):
-    """Remove confirm session files older than TTL (in seconds)."""
-    tmpdir = os.path.join(app.instance_path, 'confirm')
-    if not os.path.exists(tmpdir):
+    def slow_samples(self):
+        """Buffered slow statements, slowest first."""
+        with self._lock:
+            samples = list(self.samples)
+        return sorted(samples, key=lambda r: r['ms'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.samples.clear()
+
+
+slow_query_log = SlowQueryLog(app.config['SLOW_QUERY_THRESHOLD_MS'], app.config['SLOW_QUERY_LOG_SIZE'],
+                              app.config['SLOW_QUERY_MAX_FINGERPRINTS'])
+
+
+# ----- On-demand profiling -----
+def profile_dir():
+    return os.path.join(app.instance_path, 'profiles')
+
+
+def _profile_requested():
+    """Should this request be profiled? Explicit requests are honoured for Admins only."""
+    if request.endpoint in (None, 'static'):
+        return False
+    if request.args.get('_profile') == '1' or request.headers.get('X-Profile') == '1':
+        return session.get('role') == 'Admin'
+    rate = app.config['PROFILE_SAMPLE_RATE']
+    return request.endpoint in app.config['PROFILE_ENDPOINTS'] and rate > 0 and random.random() < rate
+
+
+@app.before_request
+def _start_profiler():
+    if not _profile_requested():
         return
+    profiler = cProfile.Profile()
     try:
-        ttl = ttl_seconds if ttl_seconds is not None else app.config.get('CONFIRM_TOKEN_TTL', 600)
-        now = time.time()
-        for fname in os.listdir(tmpdir):
-            if not fname.endswith('.json'):
-                continue
-            path = os.path.join(tmpdir, fname)
+        profiler.enable()
+    except ValueError:  # another profiler is already active on this thread
+        return
+    g.profiler = profiler
+    g.profile_name = f"{datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')}-{request.endpoint}.pstats"
+
+
+@app.after_request
+def _tag_profiled_response(response):
+    if 'profiler' in g:
+        response.headers['X-Profile-File'] = g.profile_name
+    return response
+
+
+@app.teardown_request
+def _save_profile(exc):
+    # Teardown runs after a streamed body is sent, so streaming work is included
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return
+    profiler.disable()
+    os.makedirs(profile_dir(), exist_ok=True)
+    profiler.dump_stats(os.path.join(profile_dir(), g.profile_name))
+    prune_profiles()
+
+
+def list_profiles():
+    """Saved profiles, newest first, as (name, size, mtime)."""
+    if not os.path.isdir(profile_dir()):
+        return []
+    with os.scandir(profile_dir()) as entries:
+        files = [(e.name, e.stat().st_size, e.stat().st_mtime) for e in entries if e.name.endswith('.pstats')]
+    return sorted(files, key=lambda f: f[2], reverse=True)
+
+
+def prune_profiles():
+    for name, _size, _mtime in list_profiles()[app.config['PROFILE_MAX_FILES']:]:
+        try:
+            os.remove(os.path.join(profile_dir(), name))
+        except OSError:
+            pass
+
+
+PROFILE_SORT_KEYS = ('cumulative', 'tottime', 'ncalls', 'time')
+
+
+def profile_summary(name, sort='cumulative', limit=40):
+    """Text report of the top functions in a saved profile (unknown sort keys fall back to cumulative)."""
+    if sort not in PROFILE_SORT_KEYS:
+        sort = 'cumulative'
+    out = io.StringIO()
+    stats = pstats.Stats(os.path.join(profile_dir(), name), stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+# ----- Audit log writer -----
+class AuditSink:
+    """Buffers audit records in memory and writes them in batches from one thread.
+
+    Routes call record() after their main commit instead of committing a second
+    time. The writer flushes when a batch fills up or AUDIT_FLUSH_INTERVAL passes,
+    and everything left is flushed at shutdown. Records are dropped (and counted)
+    if the queue is full.
+    """
+
+    def __init__(self, batch_size, flush_interval, max_queue):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def record(self, action, user, student_id, details=None, changes=None):
+        entry = {'action': action, 'user': user, 'student_id': student_id, 'details': details,
+                 'changes': encode_changes(changes), 'timestamp': datetime.utcnow()}
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            app.logger.warning('Audit queue full; dropped %s record for student %s', action, student_id)
+            return
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        """Block for the first record, then collect until the batch is full or the interval ends."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
             try:
-                mtime = os.path.getmtime(path)
-                if now - mtime > ttl:
-                    os.remove(path)
-                    app.logger.info('Removed expired confirm token %s', fname)
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        with app.app_context():
+            try:
+                db.session.execute(insert(Audit), batch)
+                commit_with_retry()
+                self.written += len(batch)
+                self.batches += 1
             except Exception:
-                # Ignore problems removing individual files
-                app.logger.debug('Failed to remove confirm file %s', path)
-    except Exception:
-        pass
+                db.session.rollback()
+                self.failed += len(batch)
+                app.logger.exception('Failed to write %d audit record(s)', len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Synchronously write everything queued, then wait for any batch in flight."""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self._write(batch)
+        self._queue.join()
 
+    def shutdown(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
 
-def create_confirm_session(payload):
-    """Store a confirmation payload in instance/confirm and return token."""
-    tmpdir = os.path.join(app.instance_path, 'confirm')
-    os.makedirs(tmpdir, exist_ok=True)
-    # Cleanup expired tokens opportunistically
+    def stats(self):
+        return {'queue_depth': self._queue.qsize(), 'written': self.written, 'dropped': self.dropped,
+                'failed': self.failed, 'batches': self.batches}
+
+
+audit_sink = AuditSink(app.config['AUDIT_BATCH_SIZE'], app.config['AUDIT_FLUSH_INTERVAL'], app.config['AUDIT_QUEUE_SIZE'])
+atexit.register(audit_sink.shutdown)
+
+
+# ----- Student change history -----
+# Updates are audited as {field: [old, new]} for the changed fields only, and
+# deletes carry {field: [old, null]} for every field, so any earlier state can be
+# rebuilt by walking the audit trail backwards from the current row. That only
+# holds if every writer audits its changes (routes, bulk import and
+# scripts/rescore_students.py do); an unaudited bulk UPDATE would leak its new
+# values into every rebuilt past state.
+AUDITED_STUDENT_FIELDS = ('name', 'attendance', 'activities', 'quizzes', 'performance_task', 'exam',
+                          'written_works', 'final_grade', 'risk', 'risk_score', 'notes', 'section', 'subject')
+
+
+def student_snapshot(student):
+    return {f: getattr(student, f) for f in AUDITED_STUDENT_FIELDS}
+
+
+def diff_fields(before, after):
+    """Return {field: [old, new]} for the fields whose value differs between two snapshots."""
+    return {f: [before.get(f), after.get(f)] for f in AUDITED_STUDENT_FIELDS
+            if before.get(f) != after.get(f)}
+
+
+def encode_changes(changes):
+    return json.dumps(changes, separators=(',', ':')) if changes else None
+
+
+def student_audit_query(student_id):
+    """Audit rows for a student id, starting at its newest 'create' entry.
+
+    Ids handed out before student.id was AUTOINCREMENT (migration 7) may have
+    been reused, so anything before the latest create belongs to an earlier student.
+    Returns (query, truncated); truncated is True when no 'create' row is left,
+    i.e. the start of the trail was archived (scripts/archive_audit_log.py) or
+    predates the audit log.
+    """
+    q = Audit.query.filter(Audit.student_id == student_id)
+    created = (q.filter(Audit.action == 'create')
+               .order_by(Audit.timestamp.desc(), Audit.id.desc()).first())
+    if created is None:
+        return q, True
+    return q.filter(tuple_(Audit.timestamp, Audit.id) >= (created.timestamp, created.id)), False
+
+
+def student_history(student_id):
+    """Audit entries for one student, oldest first, with their changes decoded.
+
+    Returns (entries, truncated); see student_audit_query for when the trail is truncated.
+    """
+    q, truncated = student_audit_query(student_id)
+    rows = q.order_by(Audit.timestamp, Audit.id).all()
+    return [{'id': r.id, 'timestamp': r.timestamp, 'user': r.user, 'action': r.action, 'details': r.details,
+             'changes': json.loads(r.changes) if r.changes else {}} for r in rows], truncated
+
+
+def student_state_at(student_id, at):
+    """Rebuild a student's audited fields as of `at`, or None if it did not exist then.
+
+    Starts from the live row and undoes every audited change made after `at`.
+    If the trail is truncated and `at` is older than its first remaining entry,
+    the archived changes cannot be undone: a warning is logged and the earliest
+    state that can be rebuilt is returned.
+    """
+    student = db.session.get(Student, student_id)
+    state = student_snapshot(student) if student else None
+    q, truncated = student_audit_query(student_id)
+    if truncated:
+        first = q.order_by(Audit.timestamp, Audit.id).first()
+        if first is None or at < first.timestamp:
+            app.logger.warning('Audit trail for student %s is truncated (archived); state at %s is approximate',
+                               student_id, at)
+    later = (q.filter(Audit.timestamp > at)
+             .order_by(Audit.timestamp.desc(), Audit.id.desc()))
+    for entry in later:
+        changes = json.loads(entry.changes) if entry.changes else {}
+        if entry.action == 'create':
+            state = None
+        elif entry.action == 'delete':
+            state = dict.fromkeys(AUDITED_STUDENT_FIELDS) if changes else None
+        if state is not None:
+            for field, (old, _new) in changes.items():
+                state[field] = old
+    return state
+
+
+# ----- In-process caches -----
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry TTL and hit/miss/eviction counters."""
+
+    _missing = object()
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, self._missing)
+            if entry is self._missing or entry[0] <= time.monotonic():
+                if entry is not self._missing:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+# Facet lists keyed by (owner or None for admins, column name)
+facet_cache = TTLCache(app.config['FACET_CACHE_SIZE'], app.config['FACET_CACHE_TTL'])
+# Filtered student counts keyed by (role, owner, filters)
+count_cache = TTLCache(1000, app.config['STUDENT_COUNT_CACHE_TTL'])
+
+
+def invalidate_student_caches(owners=None):
+    """Drop cached counts and facets after students owned by `owners` changed (None: everyone)."""
+    count_cache.clear()
+    if owners is None:
+        facet_cache.clear()
+        return
+    for owner in set(owners) | {None}:
+        for column in ('section', 'subject'):
+            facet_cache.pop((owner, column))
+
+
+def mark_student_caches_dirty(owners):
+    """Queue owners whose cached counts/facets go stale once this transaction ends."""
+    db.session.info.setdefault('dirty_student_owners', set()).update(owners)
+
+
+@event.listens_for(db.session, 'after_commit')
+@event.listens_for(db.session, 'after_rollback')
+def _invalidate_dirty_student_caches(session):
+    # After commit the caches must not serve pre-write values; after rollback any
+    # value cached from this transaction's flushed (now discarded) rows is dropped too.
+    owners = session.info.pop('dirty_student_owners', None)
+    if owners:
+        invalidate_student_caches(owners)
+
+
+# ----- Server-side sessions -----
+class ServerSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its ID and the payload it was loaded with."""
+
+    def __init__(self, initial=None, sid=None, payload=None, expires=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.payload = payload
+        self.expires = expires
+        self.new = sid is None
+        self.modified = False
+        self.regenerated = False
+
+    def regenerate(self):
+        """Move the data to a fresh session ID on save (call on login/privilege change)."""
+        self.regenerated = True
+        self.modified = True
+
+
+class MemorySessionBackend:
+    """Per-process LRU of session payloads; expired entries are dropped by the cache."""
+
+    def __init__(self, maxsize, ttl):
+        self.cache = TTLCache(maxsize, ttl)
+
+    def load(self, sid):
+        return self.cache.get(sid)
+
+    def save(self, sid, payload, expires):
+        self.cache.set(sid, (payload, expires))
+
+    def delete(self, sid):
+        self.cache.pop(sid)
+
+    def sweep(self):
+        return 0
+
+
+class SqliteSessionBackend:
+    """Sessions in the server_session table, with periodic deletes of expired rows."""
+
+    def __init__(self, sweep_interval):
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0
+        self.table = ServerSessionRecord.__table__
+
+    def load(self, sid):
+        with db.engine.connect() as conn:
+            row = conn.execute(db.select(self.table.c.data, self.table.c.expires)
+                               .where(self.table.c.id == sid, self.table.c.expires > time.time())).first()
+        return (row.data, row.expires) if row else None
+
+    def save(self, sid, payload, expires):
+        stmt = sqlite_insert(self.table).values(id=sid, data=payload, expires=expires)
+        stmt = stmt.on_conflict_do_update(index_elements=['id'],
+                                          set_={'data': stmt.excluded.data, 'expires': stmt.excluded.expires})
+        with db.engine.begin() as conn:
+            conn.execute(stmt)
+        if time.monotonic() >= self._next_sweep:
+            self.sweep()
+
+    def delete(self, sid):
+        with db.engine.begin() as conn:
+            conn.execute(self.table.delete().where(self.table.c.id == sid))
+
+    def sweep(self):
+        """Delete expired sessions (uses the expires index). Returns the number removed."""
+        self._next_sweep = time.monotonic() + self.sweep_interval
+        with db.engine.begin() as conn:
+            return conn.execute(self.table.delete().where(self.table.c.expires <= time.time())).rowcount
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keeps session data on the server and only a random session ID in the cookie.
+
+    The store is written only when the serialized session differs from what was
+    loaded (or its expiry is more than half used up), and the cookie is only sent
+    when a new session is created or an emptied one is removed.
+    """
+
+    serializer = TaggedJSONSerializer()
+    session_class = ServerSession
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            stored = self.backend.load(sid)
+            if stored is not None:
+                payload, expires = stored
+                return self.session_class(self.serializer.loads(payload), sid=sid, payload=payload, expires=expires)
+        return self.session_class()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if session.sid is not None:
+                self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        if session.regenerated and session.sid is not None:
+            # Drop the pre-authentication ID so it cannot be fixed on a victim
+            self.backend.delete(session.sid)
+            session.sid, session.payload, session.new = None, None, True
+
+        now = time.time()
+        payload = self.serializer.dumps(dict(session))
+        stale = session.expires is None or session.expires - now < self.ttl / 2
+        if payload != session.payload or stale:
+            if session.sid is None:
+                session.sid = secrets.token_urlsafe(24)
+            self.backend.save(session.sid, payload, now + self.ttl)
+
+        if session.new:
+            response.set_cookie(name, session.sid, domain=domain, path=path,
+                                httponly=self.get_cookie_httponly(app),
+                                secure=self.get_cookie_secure(app),
+                                samesite=self.get_cookie_samesite(app))
+
+
+def make_session_backend():
+    if app.config['SESSION_BACKEND'] == 'memory':
+        return MemorySessionBackend(app.config['SESSION_MEMORY_SIZE'], app.config['SESSION_TTL'])
+    return SqliteSessionBackend(app.config['SESSION_SWEEP_INTERVAL'])
+
+
+app.session_interface = ServerSideSessionInterface(make_session_backend(), app.config['SESSION_TTL'])
+
+
+# ----- Student query helpers -----
+def _section_filter(column, value):
+    """Match a section/subject value, treating '' and NULL as the same bucket."""
+    if not value:
+        return or_(column == '', column == None)
+    return column == value
+
+
+def visible_students_query(role, user):
+    """Admins see all students; Teachers see only students they added."""
+    if role == 'Admin':
+        return Student.query
+    return Student.query.filter_by(added_by=user)
+
+
+def apply_student_filters(base_q, q='', section=None, subject=None, risk=None):
+    """Apply the name/section/subject/risk filters shared by the student list views.
+
+    None or 'All' means no filter; 'Unassigned' matches empty or NULL values.
+    """
+    if q:
+        base_q = base_q.filter(Student.name.ilike(f"%{q}%"))
+    if section and section != 'All':
+        base_q = base_q.filter(_section_filter(Student.section, '' if section == 'Unassigned' else section))
+    if subject and subject != 'All':
+        base_q = base_q.filter(_section_filter(Student.subject, '' if subject == 'Unassigned' else subject))
+    if risk and risk != 'All':
+        base_q = base_q.filter(Student.risk == risk)
+    return base_q
+
+
+def student_facet_values(column, role, user):
+    """Sorted distinct values of a student column for filter dropdowns ('' -> 'Unassigned').
+
+    Served from facet_cache; the student write paths invalidate it.
+    """
+    key = (None if role == 'Admin' else user, column.key)
+    cached = facet_cache.get(key)
+    if cached is not None:
+        return cached
+    fq = db.session.query(column)
+    if role != 'Admin':
+        fq = fq.filter(Student.added_by == user)
+    values = set()
+    for (val,) in fq.distinct().all():
+        values.add(val if val else 'Unassigned')
+    values = sorted(values)
+    facet_cache.set(key, values)
+    return values
+
+
+def encode_cursor(direction, student_id):
+    """Opaque token for the page after/before a given student id."""
+    return cursor_serializer.dumps([direction, student_id])
+
+
+def decode_cursor(token):
+    """Return (direction, student_id) from a cursor token, or (None, None) if invalid."""
     try:
-        cleanup_confirm_sessions()
-    except Exception:
-        pass
+        direction, student_id = cursor_serializer.loads(token)
+    except (BadSignature, TypeError, ValueError):
+        return None, None
+    if direction not in ('after', 'before') or not isinstance(student_id, int):
+        return None, None
+    return direction, student_id
+
+
+def keyset_query(base_q, per_page, direction=None, anchor=None):
+    """Seek query for one page (plus one look-ahead row) before/after an anchor id."""
+    if direction == 'before':
+        return base_q.filter(Student.id < anchor).order_by(Student.id.desc()).limit(per_page + 1)
+    if direction == 'after':
+        base_q = base_q.filter(Student.id > anchor)
+    return base_q.order_by(Student.id).limit(per_page + 1)
+
+
+def keyset_page(base_q, per_page, cursor=None):
+    """Fetch one page ordered by Student.id using seek pagination.
+
+    Returns (students, prev_cursor, next_cursor); cursors are None at either end.
+    """
+    direction, anchor = decode_cursor(cursor) if cursor else (None, None)
+    rows = keyset_query(base_q, per_page, direction, anchor).all()
+    if direction == 'before':
+        has_more, rows = len(rows) > per_page, rows[:per_page]
+        rows.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_next, rows = len(rows) > per_page, rows[:per_page]
+        has_prev = direction == 'after'
+    prev_cursor = encode_cursor('before', rows[0].id) if rows and has_prev else None
+    next_cursor = encode_cursor('after', rows[-1].id) if rows and has_next else None
+    return rows, prev_cursor, next_cursor
+
+
+def section_summary_query(role, user, q='', subject=None, risk=None):
+    """Grouped (section, total, my_count) rows for the /sections headers.
+
+    Unsearched views filtered at most by High Risk are read from the
+    student_stats summary table, so their cost does not grow with the number
+    of students; other filters aggregate the student rows.
+    """
+    no_subject = not subject or subject == 'All'
+    if not q and no_subject and risk in (None, '', 'All', 'High Risk'):
+        column = StudentStats.at_risk if risk == 'High Risk' else StudentStats.total
+        agg_q = db.session.query(StudentStats.section, func.sum(column),
+                                 func.sum(case((StudentStats.added_by == user, column), else_=0)))
+        agg_q = agg_q.filter(column > 0)
+        if role != 'Admin':
+            agg_q = agg_q.filter(StudentStats.added_by == user)
+        return agg_q.group_by(StudentStats.section).order_by(StudentStats.section)
+    section_col = func.coalesce(Student.section, '')
+    agg_q = db.session.query(section_col, func.count(Student.id), func.sum(case((Student.added_by == user, 1), else_=0)))
+    if role != 'Admin':
+        agg_q = agg_q.filter(Student.added_by == user)
+    agg_q = apply_student_filters(agg_q, q, None, subject, risk)
+    return agg_q.group_by(section_col).order_by(section_col)
+
+
+def count_students(base_q, role, user, q='', section=None, subject=None, risk=None):
+    """Total rows for a student listing.
+
+    Unsearched listings filtered at most by section and High Risk are answered
+    from the student_stats summary table. Other filter combinations run a COUNT
+    that is cached per (role, user, filters).
+    """
+    no_subject = not subject or subject == 'All'
+    if not q and no_subject and risk in (None, '', 'All', 'High Risk'):
+        column = StudentStats.at_risk if risk == 'High Risk' else StudentStats.total
+        sq = db.session.query(func.coalesce(func.sum(column), 0))
+        if role != 'Admin':
+            sq = sq.filter(StudentStats.added_by == user)
+        if section and section != 'All':
+            sq = sq.filter(StudentStats.section == ('' if section == 'Unassigned' else section))
+        return int(sq.scalar())
+    key = (role, user if role != 'Admin' else None, q, section, subject, risk)
+    total = count_cache.get(key)
+    if total is None:
+        total = base_q.order_by(None).count()
+        count_cache.set(key, total)
+    return total
+
+
+def explain_query_plan(statement):
+    """Return the SQLite EXPLAIN QUERY PLAN detail lines for a SQLAlchemy statement."""
+    sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+
+
+# ----- Dashboard statistics helpers -----
+def _at_risk_sum():
+    return func.coalesce(func.sum(case((Student.risk == 'High Risk', 1), else_=0)), 0)
+
+
+def stats_key(student):
+    """Return the (added_by, section) summary row a student is counted under."""
+    return (student.added_by or '', student.section or '')
+
+
+def refresh_student_stats(keys):
+    """Recompute the summary rows for the given (added_by, section) groups.
+
+    Runs inside the caller's session so the counts commit atomically with the
+    student write; pending changes are flushed before the aggregate runs.
+    Every student write path goes through here, so it also marks the cached
+    counts and facet lists of the affected owners for invalidation once the
+    transaction commits or rolls back.
+    """
+    keys = set(keys)
+    mark_student_caches_dirty(owner for owner, _sec in keys)
+    for owner, sec in keys:
+        total, at_risk = db.session.query(func.count(Student.id), _at_risk_sum()).filter(
+            _section_filter(Student.added_by, owner),
+            _section_filter(Student.section, sec)
+        ).one()
+        row = db.session.get(StudentStats, (owner, sec))
+        if not total:
+            if row is not None:
+                db.session.delete(row)
+            continue
+        if row is None:
+            row = StudentStats(added_by=owner, section=sec)
+            db.session.add(row)
+        row.total = total
+        row.at_risk = at_risk
+
+
+def rebuild_student_stats():
+    """Rebuild the whole summary table from a single GROUP BY over students."""
+    owner_col = func.coalesce(Student.added_by, '')
+    section_col = func.coalesce(Student.section, '')
+    db.session.query(StudentStats).delete(synchronize_session=False)
+    grouped = db.session.query(owner_col, section_col, func.count(Student.id), _at_risk_sum()).group_by(owner_col, section_col)
+    db.session.execute(
+        StudentStats.__table__.insert().from_select(['added_by', 'section', 'total', 'at_risk'], grouped)
+    )
+    commit_with_retry()
+    invalidate_student_caches()
+
+
+def get_student_counts(owner=None):
+    """Return (total, at_risk) from the summary table, optionally for one owner."""
+    q = db.session.query(func.coalesce(func.sum(StudentStats.total), 0), func.coalesce(func.sum(StudentStats.at_risk), 0))
+    if owner is not None:
+        q = q.filter(StudentStats.added_by == owner)
+    total, at_risk = q.one()
+    return int(total), int(at_risk)
+
+
+# ----- Streaming CSV export -----
+def iter_csv_chunks(header, rows, flush_bytes=64 * 1024):
+    """Yield CSV text for `header` and `rows` in pieces of roughly `flush_bytes`."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= flush_bytes:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def iter_gzip_chunks(chunks):
+    """Gzip a stream of text pieces incrementally."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def csv_download(header, rows, filename):
+    """Stream rows as a CSV attachment, gzip-encoded when the client accepts it.
+
+    `rows` should be a lazy iterable so memory stays flat for any export size.
+    """
+    body = iter_csv_chunks(header, rows)
+    headers = {'Content-Disposition': f'attachment; filename={filename}', 'Vary': 'Accept-Encoding'}
+    if request.accept_encodings['gzip'] and request.args.get('gzip') != '0':
+        body = iter_gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(body), mimetype='text/csv', headers=headers)
+
+
+STUDENT_EXPORT_FIELDS = ['id', 'name', 'section', 'subject', 'activities', 'quizzes', 'performance_task', 'exam',
+                         'attendance', 'written_works', 'final_grade', 'risk', 'risk_score', 'notes']
+
+
+def iter_student_rows(base_q, fields, batch_size=1000):
+    """Yield plain column tuples for every student of a query, in id keyset batches."""
+    columns = [getattr(Student, f) for f in fields]
+    last_id = 0
+    while True:
+        batch = (base_q.filter(Student.id > last_id).order_by(Student.id)
+                 .with_entities(Student.id, *columns).limit(batch_size).all())
+        if not batch:
+            return
+        for row in batch:
+            yield row[1:]
+        last_id = batch[-1][0]
+
+
+# ----- Bulk student inserts (CSV import) -----
+# Column -> default used when an import row omits the value
+STUDENT_IMPORT_DEFAULTS = {
+    'name': '', 'section': '', 'subject': '', 'notes': '', 'risk': '',
+    'attendance': 0, 'activities': 0, 'quizzes': 0, 'written_works': 0,
+    'performance_task': 0, 'exam': 0, 'final_grade': 0, 'risk_score': None,
+}
+
+
+def bulk_insert_students(rows, owner, chunk_size=None, audit_details='Imported student {name} via CSV',
+                         skip_chunks=(), on_chunk_saved=None):
+    """Insert student dicts (any iterable) in chunked transactions.
+
+    Each chunk writes its students with one executemany, reads their ids back
+    with one query, then writes the 'create' audit rows (one executemany) and
+    the summary stats in a single commit. A failing chunk is rolled back and
+    reported without stopping the rest. Chunks whose 0-based start row is in
+    `skip_chunks` are passed over; on_chunk_saved(start) is called after each
+    commit. Returns (saved, failed_chunks) where each failed chunk is a
+    (first_row, last_row, error) tuple using 1-based row numbers.
+    """
+    chunk_size = chunk_size or app.config.get('IMPORT_CHUNK_SIZE', 500)
+    saved = 0
+    failed_chunks = []
+    rows = iter(rows)
+    start = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        if start in skip_chunks:
+            start += len(chunk)
+            continue
+        params = []
+        for r in chunk:
+            values = {k: r.get(k, default) for k, default in STUDENT_IMPORT_DEFAULTS.items()}
+            values['added_by'] = owner
+            params.append(values)
+        try:
+            db.session.execute(insert(Student), params)
+            # The INSERT holds SQLite's write lock until commit and student ids are
+            # AUTOINCREMENT, so this chunk's rows are the newest len(params) ids.
+            ids = db.session.scalars(
+                db.select(Student.id).order_by(Student.id.desc()).limit(len(params))
+            ).all()[::-1]
+            db.session.execute(insert(Audit), [
+                {'action': 'create', 'user': owner, 'student_id': sid, 'details': audit_details.format(name=p['name'])}
+                for sid, p in zip(ids, params)
+            ])
+            refresh_student_stats((owner or '', p['section'] or '') for p in params)
+            commit_with_retry()
+            saved += len(params)
+            if on_chunk_saved is not None:
+                on_chunk_saved(start)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception('Bulk insert failed for rows %d-%d', start + 1, start + len(chunk))
+            failed_chunks.append((start + 1, start + len(chunk), str(e)))
+        start += len(chunk)
+    return saved, failed_chunks
+
+
+# ----- Confirmation session helpers (PRG flow) -----
+# Payloads live in the confirm_token table: lookups go by primary key and
+# expired rows are evicted a few at a time, oldest first, via the expires index.
+def _evict_expired_confirm_tokens(conn, limit=None):
+    t = ConfirmToken.__table__
+    expired = db.select(t.c.token).where(t.c.expires <= time.time()).order_by(t.c.expires)
+    if limit is not None:
+        expired = expired.limit(limit)
+    return conn.execute(t.delete().where(t.c.token.in_(expired.scalar_subquery()))).rowcount
+
+
+def cleanup_confirm_sessions():
+    """Remove every expired confirmation token. Returns the number removed."""
+    with db.engine.begin() as conn:
+        removed = _evict_expired_confirm_tokens(conn)
+    if removed:
+        app.logger.info('Removed %d expired confirm token(s)', removed)
+    return removed
+
+
+def create_confirm_session(payload):
+    """Store a confirmation payload and return its token."""
     token = uuid.uuid4().hex
-    path = os.path.join(tmpdir, token + '.json')
-    with open(path, 'w', encoding='utf-8') as fh:
-        json.dump(payload, fh)
+    now = time.time()
+    with db.engine.begin() as conn:
+        _evict_expired_confirm_tokens(conn, app.config['CONFIRM_EVICT_BATCH'])
+        conn.execute(insert(ConfirmToken).values(token=token, payload=json.dumps(payload), created=now,
+                                                 expires=now + app.config.get('CONFIRM_TOKEN_TTL', 600)))
     return token
 
+
+def load_confirm_session(token):
+    """Return the payload for a live token, or None if it is unknown or expired."""
+    t = ConfirmToken.__table__
+    with db.engine.connect() as conn:
+        payload = conn.execute(db.select(t.c.payload)
+                               .where(t.c.token == token, t.c.expires > time.time())).scalar()
+    return json.loads(payload) if payload is not None else None
+
+
 @app.route('/confirm/<token>')
 def confirm_view(token):
-    tmpdir = os.path.join(app.instance_path, 'confirm')
-    path = os.path.join(tmpdir, token + '.json')
-    # Cleanup expired tokens opportunistically
-    try:
-        cleanup_confirm_sessions()
-    except Exception:
-        pass
-
-    if not os.path.exists(path):
+    payload = load_confirm_session(token)
+    if payload is None:
         flash('Confirmation expired or invalid.')
         return redirect(url_for('dashboard'))
-    with open(path, 'r', encoding='utf-8') as fh:
-        payload = json.load(fh)
     # Render the overlay-style confirm page
     return render_template('confirm_action.html', **payload)
 
@@ -283,17 +1831,12 @@ def login():
         username = request.form['username']
         password = request.form['password']
 
-        try:
-            user = User.query.filter_by(username=username).first()
-        except OperationalError as e:
-            # Try to fix schema, then retry
-            app.logger.warning('OperationalError querying user table, attempting migration: %s', e)
-            add_role_column_if_missing()
-            user = User.query.filter_by(username=username).first()
+        user = User.query.filter_by(username=username).first()
 
         if user and check_password_hash(user.password, password):
             session['user'] = user.username
             session['role'] = user.role
+            session.regenerate()
             return redirect(url_for('dashboard'))
         else:
             flash('Invalid username or password')
@@ -309,12 +1852,7 @@ def register():
         role = request.form['role']
 
         # prevent duplicate usernames
-        try:
-            exists = User.query.filter_by(username=username).first()
-        except OperationalError as e:
-            app.logger.warning('OperationalError querying user table, attempting migration: %s', e)
-            add_role_column_if_missing()
-            exists = User.query.filter_by(username=username).first()
+        exists = User.query.filter_by(username=username).first()
 
         if exists:
             flash('Username already exists')
@@ -460,6 +1998,9 @@ def change_role(user_id):
         user.role = new_role
         try:
             commit_with_retry()
+            if user.username == session.get('user'):
+                session['role'] = new_role
+                session.regenerate()
             flash('Role updated')
         except OperationalError:
             flash('Could not update role right now (database busy). Please try again.')
@@ -478,70 +2019,23 @@ def manage_students():
     selected_section = request.args.get('section', 'All')
     selected_subject = request.args.get('subject', 'All')
     selected_risk = request.args.get('risk', 'All')
-    try:
-        page = int(request.args.get('page', 1))
-    except ValueError:
-        page = 1
+    cursor = request.args.get('cursor') or None
     per_page = 10
 
     # Build list of available risk values for UI
     risk_list = ['High Risk', 'Low Risk']
 
-    # Base query depends on role
-    if session.get('role') == 'Admin':
-        base_q = Student.query
-    else:
-        base_q = Student.query.filter_by(added_by=session.get('user'))
+    # Base query depends on role, then search/section/subject/risk filters
+    base_q = visible_students_query(session.get('role'), session.get('user'))
+    base_q = apply_student_filters(base_q, q, selected_section, selected_subject, selected_risk)
 
-    # Apply search by name
-    if q:
-        base_q = base_q.filter(Student.name.ilike(f"%{q}%"))
-
-    # Apply section filter
-    if selected_section and selected_section != 'All':
-        if selected_section == 'Unassigned':
-            base_q = base_q.filter(or_(Student.section == '', Student.section == None))
-        else:
-            base_q = base_q.filter(Student.section == selected_section)
-
-    # Apply subject filter
-    if selected_subject and selected_subject != 'All':
-        if selected_subject == 'Unassigned':
-            base_q = base_q.filter(or_(Student.subject == '', Student.subject == None))
-        else:
-            base_q = base_q.filter(Student.subject == selected_subject)
-
-    # Apply risk filter
-    if selected_risk and selected_risk != 'All':
-        base_q = base_q.filter(Student.risk == selected_risk)
-
-    total = base_q.count()
-    total_pages = max(1, math.ceil(total / per_page))
-
-    students = base_q.order_by(Student.id).offset((page - 1) * per_page).limit(per_page).all()
+    # Seek pagination on Student.id; the total comes from stats or a cached count
+    students, prev_cursor, next_cursor = keyset_page(base_q, per_page, cursor)
+    total = count_students(base_q, session.get('role'), session.get('user'), q, selected_section, selected_subject, selected_risk)
 
     # Build list of available sections and subjects for filters (based on current role visibility)
-    if session.get('role') == 'Admin':
-        raw_sections = db.session.query(Student.section).distinct().all()
-        raw_subjects = db.session.query(Student.subject).distinct().all()
-    else:
-        raw_sections = db.session.query(Student.section).filter(Student.added_by == session.get('user')).distinct().all()
-        raw_subjects = db.session.query(Student.subject).filter(Student.added_by == session.get('user')).distinct().all()
-    sections_list = []
-    for (sec,) in raw_sections:
-        if not sec or sec == '':
-            sections_list.append('Unassigned')
-        else:
-            sections_list.append(sec)
-    sections_list = sorted(list(set(sections_list)))
-
-    subjects_list = []
-    for (subj,) in raw_subjects:
-        if not subj or subj == '':
-            subjects_list.append('Unassigned')
-        else:
-            subjects_list.append(subj)
-    subjects_list = sorted(list(set(subjects_list)))
+    sections_list = student_facet_values(Student.section, session.get('role'), session.get('user'))
+    subjects_list = student_facet_values(Student.subject, session.get('role'), session.get('user'))
 
     # Remember last area (identifier only) so Back returns to the previous dashboard area
     session['last_area'] = 'manage_students'
@@ -556,13 +2050,26 @@ def manage_students():
         sections_list=sections_list,
         subjects_list=subjects_list,
         risk_list=risk_list,
-        page=page,
-        total_pages=total_pages,
+        prev_cursor=prev_cursor,
+        next_cursor=next_cursor,
         total=total,
         per_page=per_page
     )
 
 
+@app.route('/admin/students/export')
+def export_students():
+    """Download every student the current user added as CSV."""
+    if 'user' not in session:
+        return redirect(url_for('login'))
+    if session.get('role') not in ('Admin', 'Teacher'):
+        flash('Admin or Teacher access required.')
+        return redirect(url_for('dashboard'))
+
+    mine = Student.query.filter_by(added_by=session.get('user'))
+    return csv_download(STUDENT_EXPORT_FIELDS, iter_student_rows(mine, STUDENT_EXPORT_FIELDS), 'my_students.csv')
+
+
 @app.route('/admin/students/edit/<int:student_id>', methods=['GET', 'POST'])
 def edit_student(student_id):
     if 'user' not in session:
@@ -580,7 +2087,8 @@ def edit_student(student_id):
 
     if request.method == 'POST':
         # Save previous for audit
-        prev = { 'attendance': student.attendance, 'activities': student.activities, 'quizzes': student.quizzes, 'performance_task': student.performance_task, 'exam': student.exam }
+        prev = student_snapshot(student)
+        prev_stats_key = stats_key(student)
 
         student.name = request.form.get('name')
         student.attendance = float(request.form.get('attendance') or 0)
@@ -589,32 +2097,22 @@ def edit_student(student_id):
         student.notes = request.form.get('notes') or ''
         student.section = request.form.get('section') or ''
         student.subject = request.form.get('subject') or ''
-        student.written_works = (student.activities + student.quizzes) / 2 if (student.activities or student.quizzes) else 0
         student.performance_task = float(request.form.get('performance_task') or 0)
         student.exam = float(request.form.get('exam') or 0)
-        student.final_grade = round(student.written_works * 0.20 + student.performance_task * 0.50 + student.exam * 0.30, 2)
-
-        # Determine risk based on final_grade threshold: >=76 -> Low Risk
-        try:
-            student.risk = 'Low Risk' if student.final_grade >= 76 else 'High Risk'
-        except Exception:
-            # Keep previous value on failure
-            student.risk = student.risk
+        student.written_works, student.final_grade, student.risk = score_student(
+            student.activities, student.quizzes, student.performance_task, student.exam)
+        scores = risk_model.predict_proba([student.attendance], [student.final_grade])
+        student.risk_score = scores[0] if scores else None
 
         try:
+            refresh_student_stats([prev_stats_key, stats_key(student)])
             commit_with_retry()
         except OperationalError:
             flash('Update failed due to database being busy. Please try again.')
             return redirect(url_for('manage_students'))
-        try:
-            audit = Audit(action='update', user=session.get('user'), student_id=student.id, details=f'Updated fields from {prev} to {{"attendance":{student.attendance}, "activities":{student.activities}, "quizzes":{student.quizzes}, "performance_task":{student.performance_task}, "exam":{student.exam}}}')
-            db.session.add(audit)
-            try:
-                commit_with_retry()
-            except OperationalError:
-                pass
-        except Exception:
-            pass
+        changes = diff_fields(prev, student_snapshot(student))
+        if changes:
+            audit_sink.record('update', session.get('user'), student.id, changes=changes)
 
         flash('Student updated')
         return redirect(url_for('manage_students'))
@@ -622,11 +2120,193 @@ def edit_student(student_id):
     return render_template('edit_student.html', student=student)
 
 
+# ----- Audit log queries -----
+AUDIT_EXPORT_FIELDS = ['id', 'timestamp', 'user', 'action', 'student_id', 'details', 'changes']
+
+
+def audit_filters_from_args(args):
+    """Read the audit viewer filters from request args, dropping invalid values."""
+    filters = {k: (args.get(k) or '').strip() for k in ('user', 'action', 'student_id', 'date_from', 'date_to')}
+    if filters['student_id'] and not filters['student_id'].isdigit():
+        filters['student_id'] = ''
+    for key in ('date_from', 'date_to'):
+        try:
+            if filters[key]:
+                datetime.strptime(filters[key], '%Y-%m-%d')
+        except ValueError:
+            filters[key] = ''
+    return filters
+
+
+def filtered_audit_query(filters):
+    """Audit query for the given filters; date_to is inclusive of the whole day."""
+    aq = Audit.query
+    if filters.get('user'):
+        aq = aq.filter(Audit.user == filters['user'])
+    if filters.get('action'):
+        aq = aq.filter(Audit.action == filters['action'])
+    if filters.get('student_id'):
+        aq = aq.filter(Audit.student_id == int(filters['student_id']))
+    if filters.get('date_from'):
+        aq = aq.filter(Audit.timestamp >= datetime.strptime(filters['date_from'], '%Y-%m-%d'))
+    if filters.get('date_to'):
+        aq = aq.filter(Audit.timestamp < datetime.strptime(filters['date_to'], '%Y-%m-%d') + timedelta(days=1))
+    return aq
+
+
+def _audit_seek(aq, cursor):
+    """Restrict an audit query to rows older than a (timestamp, id) cursor, newest first."""
+    if cursor is not None:
+        aq = aq.filter(tuple_(Audit.timestamp, Audit.id) < cursor)
+    return aq.order_by(Audit.timestamp.desc(), Audit.id.desc())
+
+
+def decode_audit_cursor(token):
+    try:
+        ts, audit_id = audit_cursor_serializer.loads(token)
+        return datetime.fromisoformat(ts), int(audit_id)
+    except (BadSignature, TypeError, ValueError):
+        return None
+
+
+def iter_audit_rows(aq, batch_size=1000):
+    """Yield every audit row of a query newest first, fetching keyset batches."""
+    cursor = None
+    while True:
+        batch = _audit_seek(aq, cursor).limit(batch_size).all()
+        if not batch:
+            return
+        yield from batch
+        cursor = (batch[-1].timestamp, batch[-1].id)
+        db.session.expunge_all()
+
+
 @app.route('/admin/audit')
 @admin_required
 def view_audit():
-    records = Audit.query.order_by(Audit.timestamp.desc()).limit(100).all()
-    return render_template('admin_audit.html', records=records)
+    filters = audit_filters_from_args(request.args)
+    per_page = app.config.get('AUDIT_PAGE_SIZE', 100)
+    cursor = decode_audit_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    rows = _audit_seek(filtered_audit_query(filters), cursor).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = audit_cursor_serializer.dumps([rows[-1].timestamp.isoformat(), rows[-1].id])
+    active = {k: v for k, v in filters.items() if v}
+    return render_template('admin_audit.html', records=rows, filters=filters, active_filters=active,
+                           next_cursor=next_cursor, is_first_page=cursor is None)
+
+
+@app.route('/admin/audit/export')
+@admin_required
+def export_audit():
+    """Stream the filtered audit log as CSV (default) or NDJSON."""
+    filters = audit_filters_from_args(request.args)
+    fmt = request.args.get('format', 'csv')
+    rows = iter_audit_rows(filtered_audit_query(filters))
+
+    def as_dict(r):
+        return {'id': r.id, 'timestamp': r.timestamp.isoformat() if r.timestamp else None, 'user': r.user,
+                'action': r.action, 'student_id': r.student_id, 'details': r.details, 'changes': r.changes}
+
+    if fmt != 'ndjson':
+        return csv_download(AUDIT_EXPORT_FIELDS, ([as_dict(r)[k] for k in AUDIT_EXPORT_FIELDS] for r in rows),
+                            'audit_log.csv')
+
+    def generate():
+        for r in rows:
+            yield json.dumps(as_dict(r)) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+        'Content-Disposition': 'attachment; filename=audit_log.ndjson'
+    })
+
+# ----- Metrics -----
+@app.route('/admin/metrics')
+@admin_required
+def view_metrics():
+    return render_template('admin_metrics.html', endpoints=request_metrics.snapshot(), db=db_metrics(),
+                           caches={'facet': facet_cache.stats(), 'count': count_cache.stats()},
+                           audit=audit_sink.stats(), model=risk_model.metrics(),
+                           enabled=app.config['METRICS_ENABLED'])
+
+
+@app.route('/admin/metrics/reset', methods=['POST'])
+@admin_required
+def reset_metrics():
+    request_metrics.reset()
+    flash('Request metrics reset.')
+    return redirect(url_for('view_metrics'))
+
+
+@app.route('/admin/slow-queries')
+@admin_required
+def view_slow_queries():
+    """Fingerprint table and slow-statement buffer; ?format=json downloads both."""
+    fingerprints = slow_query_log.fingerprints()
+    samples = slow_query_log.slow_samples()
+    if request.args.get('format') == 'json':
+        body = json.dumps({'threshold_ms': app.config['SLOW_QUERY_THRESHOLD_MS'],
+                           'fingerprints': fingerprints, 'slow': samples}, indent=2)
+        return Response(body, mimetype='application/json', headers={
+            'Content-Disposition': 'attachment; filename=slow_queries.json'
+        })
+    return render_template('admin_slow_queries.html', fingerprints=fingerprints[:100], samples=samples,
+                           threshold_ms=app.config['SLOW_QUERY_THRESHOLD_MS'],
+                           enabled=app.config['SLOW_QUERY_ENABLED'])
+
+
+@app.route('/admin/slow-queries/reset', methods=['POST'])
+@admin_required
+def reset_slow_queries():
+    slow_query_log.reset()
+    flash('Slow-query log reset.')
+    return redirect(url_for('view_slow_queries'))
+
+
+@app.route('/admin/profiling', methods=['GET', 'POST'])
+@admin_required
+def view_profiling():
+    if request.method == 'POST':
+        endpoints = set(request.form.getlist('endpoints')) & set(app.view_functions)
+        try:
+            rate = min(max(float(request.form.get('sample_rate') or 0), 0.0), 1.0)
+        except ValueError:
+            rate = 0.0
+        app.config['PROFILE_ENDPOINTS'] = endpoints
+        app.config['PROFILE_SAMPLE_RATE'] = rate
+        flash(f'Profiling {len(endpoints)} endpoint(s) at a sample rate of {rate:g}.' if endpoints and rate
+              else 'Sampled profiling is off.')
+        return redirect(url_for('view_profiling'))
+
+    selected = request.args.get('profile')
+    summary = None
+    if selected and selected in {p[0] for p in list_profiles()}:
+        summary = profile_summary(selected, request.args.get('sort', 'cumulative'))
+    return render_template('admin_profiling.html', profiles=list_profiles(), selected=selected, summary=summary,
+                           sort_keys=PROFILE_SORT_KEYS,
+                           endpoints=sorted(e for e in app.view_functions if e != 'static'),
+                           active=app.config['PROFILE_ENDPOINTS'], sample_rate=app.config['PROFILE_SAMPLE_RATE'])
+
+
+@app.route('/admin/profiling/download/<name>')
+@admin_required
+def download_profile(name):
+    if name not in {p[0] for p in list_profiles()}:
+        flash('Profile not found.')
+        return redirect(url_for('view_profiling'))
+    return send_from_directory(profile_dir(), name, as_attachment=True)
+
+
+@app.route('/metrics')
+def prometheus_endpoint():
+    """Prometheus text exposition; needs an Admin session or the METRICS_TOKEN bearer token."""
+    token = app.config.get('METRICS_TOKEN')
+    authorized = session.get('role') == 'Admin' or (
+        token and secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'))
+    if not authorized:
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(prometheus_metrics(), mimetype='text/plain; version=0.0.4')
+
 
 @app.route('/admin/students/delete/<int:student_id>', methods=['POST'])
 def delete_student(student_id):
@@ -657,18 +2337,14 @@ def delete_student(student_id):
             })
             return redirect(url_for('confirm_view', token=token), 303)
 
+        name = s.name
+        snapshot = student_snapshot(s)
         db.session.delete(s)
         try:
+            refresh_student_stats([stats_key(s)])
             commit_with_retry()
-            try:
-                audit = Audit(action='delete', user=session.get('user'), student_id=student_id, details=f'Deleted student {s.name}')
-                db.session.add(audit)
-                try:
-                    commit_with_retry()
-                except OperationalError:
-                    pass
-            except Exception:
-                pass
+            audit_sink.record('delete', session.get('user'), student_id, f'Deleted student {name}',
+                              changes=diff_fields(snapshot, {}))
             flash('Student removed')
         except OperationalError:
             flash('Could not remove student right now (database busy). Please try again.')
@@ -685,58 +2361,32 @@ def sections():
     selected_subject = request.args.get('subject', None)
     selected_risk = request.args.get('risk', None)
 
-    # Admins see all students; Teachers see only students they added
-    if session.get('role') == 'Admin':
-        base_q = Student.query
-    else:
-        base_q = Student.query.filter_by(added_by=session.get('user'))
-
-    # Apply section filter if requested
-    if selected_section:
-        if selected_section == 'Unassigned':
-            base_q = base_q.filter(or_(Student.section == '', Student.section == None))
-        else:
-            base_q = base_q.filter(Student.section == selected_section)
+    cursor = request.args.get('cursor') or None
+    role, user = session.get('role'), session.get('user')
 
-    # Apply name filter
-    if q:
-        base_q = base_q.filter(Student.name.ilike(f"%{q}%"))
+    # Section headers and counts come from one grouped aggregate; student rows
+    # are only loaded (a page at a time) for the expanded section.
+    sections = []
+    for sec, total, my_count in section_summary_query(role, user, q, selected_subject, selected_risk).all():
+        sections.append({'name': sec or 'Unassigned', 'total': total, 'my_count': my_count or 0})
 
-    # Apply subject filter
-    if selected_subject and selected_subject != 'All':
-        if selected_subject == 'Unassigned':
-            base_q = base_q.filter(or_(Student.subject == '', Student.subject == None))
-        else:
-            base_q = base_q.filter(Student.subject == selected_subject)
-
-    # Apply risk filter
-    if selected_risk and selected_risk != 'All':
-        base_q = base_q.filter(Student.risk == selected_risk)
-
-    students = base_q.all()
-
-    sections = {}
-    for s in students:
-        key = s.section or 'Unassigned'
-        sections.setdefault(key, []).append(s)
+    # Expand the requested section, or the first one by default
+    names = [sec['name'] for sec in sections]
+    expanded = selected_section if selected_section in names else (names[0] if names else None)
+    students, prev_cursor, next_cursor = [], None, None
+    if expanded:
+        base_q = apply_student_filters(visible_students_query(role, user), q, expanded, selected_subject, selected_risk)
+        students, prev_cursor, next_cursor = keyset_page(base_q, app.config.get('SECTION_PAGE_SIZE', 25), cursor)
 
     # Build subjects list for filter dropdown
-    if session.get('role') == 'Admin':
-        raw_subjects = db.session.query(Student.subject).distinct().all()
-    else:
-        raw_subjects = db.session.query(Student.subject).filter(Student.added_by == session.get('user')).distinct().all()
-    subjects_list = []
-    for (subj,) in raw_subjects:
-        if not subj or subj == '':
-            subjects_list.append('Unassigned')
-        else:
-            subjects_list.append(subj)
-    subjects_list = sorted(list(set(subjects_list)))
+    subjects_list = student_facet_values(Student.subject, session.get('role'), session.get('user'))
 
     # Remember last area (identifier only) so Back returns to the previous dashboard area
     session['last_area'] = 'sections'
 
-    return render_template('sections.html', sections=sections, subjects_list=subjects_list, selected_risk=selected_risk)
+    return render_template('sections.html', sections=sections, expanded=expanded, students=students,
+                           prev_cursor=prev_cursor, next_cursor=next_cursor,
+                           subjects_list=subjects_list, selected_risk=selected_risk)
 
 
 @app.route('/sections/delete', methods=['POST'])
@@ -755,11 +2405,7 @@ def delete_section_students():
         sec_val = sec
 
     # Only delete students in this section that were added by the current user
-    q = Student.query.filter(Student.added_by == session.get('user'))
-    if sec_val == '':
-        q = q.filter(or_(Student.section == '', Student.section == None))
-    else:
-        q = q.filter(Student.section == sec_val)
+    q = Student.query.filter(Student.added_by == session.get('user'), _section_filter(Student.section, sec_val))
 
     count = q.count()
     if count == 0:
@@ -785,10 +2431,12 @@ def delete_section_students():
         for s in students_to_delete:
             db.session.delete(s)
             try:
-                audit = Audit(action='delete', user=session.get('user'), student_id=s.id, details=f'Deleted student {s.name} via section bulk delete')
+                audit = Audit(action='delete', user=session.get('user'), student_id=s.id, details=f'Deleted student {s.name} via section bulk delete',
+                              changes=encode_changes(diff_fields(student_snapshot(s), {})))
                 db.session.add(audit)
             except Exception:
                 pass
+        refresh_student_stats([stats_key(s) for s in students_to_delete])
         try:
             commit_with_retry()
             flash(f'Deleted {count} student(s) from section {sec}.')
@@ -827,14 +2475,12 @@ def dashboard():
     if 'user' not in session:
         return redirect(url_for('login'))
 
-    # Admins see all students; Teachers see only students they added
+    # Admins see all students; Teachers see only students they added.
+    # Counts come from the per-owner/per-section summary table.
     if session.get('role') == 'Admin':
-        students = Student.query.all()
+        total, at_risk = get_student_counts()
     else:
-        students = Student.query.filter_by(added_by=session.get('user')).all()
-
-    total = len(students)
-    at_risk = len([s for s in students if s.risk == "High Risk"])
+        total, at_risk = get_student_counts(session.get('user'))
 
     # Remember last area (identifier only) so Back returns to the previous dashboard area
     session['last_area'] = 'dashboard'
@@ -859,14 +2505,9 @@ def predict():
         return redirect(url_for('login'))
 
     risk = None
+    risk_score = None
 
     if request.method == 'POST':
-        # Ensure student columns exist before inserting
-        try:
-            ensure_student_columns()
-        except Exception:
-            pass
-
         name = request.form['name']
         attendance = float(request.form.get('attendance', 0) or 0)
 
@@ -874,7 +2515,6 @@ def predict():
         activities = float(request.form.get('activities', 0) or 0)
         quizzes = float(request.form.get('quizzes', 0) or 0)
         notes = request.form.get('notes', '')
-        written_works = (activities + quizzes) / 2 if (activities or quizzes) else 0
 
         # Performance Task (PT) components
         performance_task = float(request.form.get('performance_task', 0) or 0)
@@ -882,19 +2522,10 @@ def predict():
         # Exam
         exam = float(request.form.get('exam', 0) or 0)
 
-        # Compute final grade using new weights: WW 20%, PT 50%, Exam 30%
-        final_grade = round(written_works * 0.20 + performance_task * 0.50 + exam * 0.30, 2)
-
-        # Determine risk using final_grade threshold: >=76 -> Low Risk, <=75 -> High Risk
-        try:
-            if final_grade >= 76:
-                risk = "Low Risk"
-            else:
-                risk = "High Risk"
-        except Exception as e:
-            # Fallback if something unexpected occurs
-            flash('Risk computation failed: ' + str(e))
-            risk = None
+        # Compute final grade (WW 20%, PT 50%, Exam 30%) and threshold risk
+        written_works, final_grade, risk = score_student(activities, quizzes, performance_task, exam)
+        scores = risk_model.predict_proba([attendance], [final_grade])
+        risk_score = scores[0] if scores else None
 
         section = request.form.get('section', '')
         subject = request.form.get('subject', '')
@@ -924,6 +2555,7 @@ def predict():
             exam=exam,
             final_grade=final_grade,
             risk=risk,
+            risk_score=risk_score,
             added_by=session['user'],
             section=section,
             subject=subject
@@ -931,25 +2563,231 @@ def predict():
 
         db.session.add(student)
         try:
+            refresh_student_stats([stats_key(student)])
             commit_with_retry()
         except OperationalError:
             flash('Could not save student right now (database busy). Please try again.')
-            return render_template('predict.html', risk=risk)
-        try:
-            audit = Audit(action='create', user=session.get('user'), student_id=student.id, details=f'Created student {student.name}')
-            db.session.add(audit)
-            try:
-                commit_with_retry()
-            except OperationalError:
-                pass
-        except Exception:
-            pass
+            return render_template('predict.html', risk=risk, risk_score=risk_score)
+        audit_sink.record('create', session.get('user'), student.id, f'Created student {student.name}')
 
-    return render_template('predict.html', risk=risk)
+    return render_template('predict.html', risk=risk, risk_score=risk_score)
 
 # =========================
 # CSV IMPORT (Preview -> Save -> Download)
 # =========================
+def import_dir():
+    return os.path.join(app.instance_path, 'imports')
+
+
+def _score_import_batch(batch):
+    """Score parsed import rows in one vectorized pass and yield result records."""
+    written_works, final_grades, risks = score_batch(
+        [r['activities'] for r in batch], [r['quizzes'] for r in batch],
+        [r['performance_task'] for r in batch], [r['exam'] for r in batch])
+    risk_scores = risk_model.predict_proba([r['attendance'] for r in batch], final_grades) or [None] * len(batch)
+    for r, ww, fg, risk, score in zip(batch, written_works, final_grades, risks, risk_scores):
+        r['written_works'] = ww
+        r['final_grade'] = fg
+        r['risk'] = risk
+        r['risk_score'] = score
+        yield 'result', r
+
+
+def iter_import_rows(lines, batch_size=None):
+    """Validate and score CSV rows lazily.
+
+    Valid rows are scored in vectorized batches of `batch_size`. Yields
+    ('result', record) for valid rows and ('error', record) for invalid ones.
+    """
+    batch_size = batch_size or app.config.get('IMPORT_CHUNK_SIZE', 500)
+    batch = []
+    reader = csv.DictReader(lines)
+    for idx, row in enumerate(reader, start=1):
+        # Normalize keys to lowercase
+        row = {k.strip(): (v.strip() if v is not None else '') for k,v in row.items()}
+        name = row.get('name','').strip()
+        if not name:
+            yield 'error', {'row': idx, 'errors': ['missing name'], 'raw': row}
+            continue
+        def asfloat(x):
+            try:
+                return float(x or 0)
+            except Exception:
+                return None
+        activities = asfloat(row.get('activities',0))
+        quizzes = asfloat(row.get('quizzes',0))
+        performance_task = asfloat(row.get('performance_task',0))
+        exam = asfloat(row.get('exam',0))
+        attendance = asfloat(row.get('attendance',0))
+        if None in (activities, quizzes, performance_task, exam, attendance):
+            yield 'error', {'row': idx, 'errors': ['invalid numeric'], 'raw': row}
+            continue
+        batch.append({
+            'name': name,
+            'section': row.get('section',''),
+            'subject': row.get('subject',''),
+            'activities': activities,
+            'quizzes': quizzes,
+            'performance_task': performance_task,
+            'exam': exam,
+            'attendance': attendance,
+            'notes': row.get('notes',''),
+        })
+        if len(batch) >= batch_size:
+            yield from _score_import_batch(batch)
+            batch = []
+    if batch:
+        yield from _score_import_batch(batch)
+
+
+# Each import session is a directory instance/imports/<token>/ holding
+# results.bin and errors.bin (back-to-back zlib-compressed NDJSON chunks) and
+# meta.json with the counts and an index of [offset, length, rows] per chunk,
+# so any row range can be read by decompressing only the chunks it touches.
+IMPORT_KINDS = {'result': 'results.bin', 'error': 'errors.bin'}
+
+
+# Import tokens are str(uuid.uuid4()); anything else never becomes a path
+IMPORT_TOKEN_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}')
+
+
+def import_session_dir(token):
+    """Directory of one import session; aborts with 404 for a malformed token."""
+    if not IMPORT_TOKEN_RE.fullmatch(token or ''):
+        abort(404)
+    return os.path.join(import_dir(), token)
+
+
+def spool_import(token, rows, chunk_rows=None):
+    """Write scored rows to the import session store and return its meta dict."""
+    chunk_rows = chunk_rows or app.config.get('IMPORT_STORE_CHUNK_ROWS', 1000)
+    base = import_session_dir(token)
+    os.makedirs(base, exist_ok=True)
+    files = {kind: open(os.path.join(base, name), 'wb') for kind, name in IMPORT_KINDS.items()}
+    pending = {kind: [] for kind in IMPORT_KINDS}
+    index = {kind: [] for kind in IMPORT_KINDS}
+    counts = {kind: 0 for kind in IMPORT_KINDS}
+
+    def flush_chunk(kind):
+        data = zlib.compress(''.join(pending[kind]).encode('utf-8'))
+        fh = files[kind]
+        index[kind].append([fh.tell(), len(data), len(pending[kind])])
+        fh.write(data)
+        pending[kind] = []
+
+    try:
+        for kind, record in rows:
+            pending[kind].append(json.dumps(record) + '\n')
+            counts[kind] += 1
+            if len(pending[kind]) >= chunk_rows:
+                flush_chunk(kind)
+        for kind in IMPORT_KINDS:
+            if pending[kind]:
+                flush_chunk(kind)
+    finally:
+        for fh in files.values():
+            fh.close()
+    meta = {'valid': counts['result'], 'invalid': counts['error'], 'created': time.time(),
+            'chunk_rows': chunk_rows, 'index': index}
+    save_import_meta(token, meta)
+    return meta
+
+
+def save_import_meta(token, meta):
+    """Atomically replace an import session's meta.json."""
+    path = os.path.join(import_session_dir(token), 'meta.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as fh:
+        json.dump(meta, fh)
+    os.replace(path + '.tmp', path)
+
+
+def discard_import(token):
+    shutil.rmtree(import_session_dir(token), ignore_errors=True)
+
+
+def load_import_meta(token):
+    """Return the spooled import summary, or None if the session is unknown or expired."""
+    path = os.path.join(import_session_dir(token), 'meta.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as fh:
+        meta = json.load(fh)
+    if time.time() - meta['created'] > app.config['IMPORT_SESSION_TTL']:
+        return None
+    return meta
+
+
+def iter_import_rows_range(token, kind='result', start=0, stop=None, meta=None):
+    """Yield rows [start, stop) of one kind from a spooled import, chunk by chunk."""
+    meta = meta or load_import_meta(token)
+    if meta is None:
+        return
+    chunk_rows = meta['chunk_rows']
+    with open(os.path.join(import_session_dir(token), IMPORT_KINDS[kind]), 'rb') as fh:
+        for i, (offset, length, count) in enumerate(meta['index'][kind][start // chunk_rows:], start=start // chunk_rows):
+            first = i * chunk_rows
+            if stop is not None and first >= stop:
+                break
+            fh.seek(offset)
+            lines = zlib.decompress(fh.read(length)).decode('utf-8').splitlines()
+            lo = max(start - first, 0)
+            hi = count if stop is None else min(stop - first, count)
+            for line in lines[lo:hi]:
+                yield json.loads(line)
+
+
+def read_import_rows(token, start, stop, kind='result', meta=None):
+    return list(iter_import_rows_range(token, kind, start, stop, meta))
+
+
+def iter_import_results(token):
+    """Stream the valid rows of a spooled import, one record at a time."""
+    return iter_import_rows_range(token, 'result')
+
+
+_next_import_sweep = 0
+
+
+def cleanup_import_sessions(ttl_seconds=None):
+    """Remove import sessions older than IMPORT_SESSION_TTL. Returns the number removed."""
+    global _next_import_sweep
+    _next_import_sweep = time.time() + app.config['IMPORT_SWEEP_INTERVAL']
+    ttl = ttl_seconds if ttl_seconds is not None else app.config['IMPORT_SESSION_TTL']
+    root = import_dir()
+    if not os.path.isdir(root):
+        return 0
+    removed = 0
+    cutoff = time.time() - ttl
+    with os.scandir(root) as entries:
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+                if entry.is_dir():
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)  # single-file previews from older versions
+                removed += 1
+            except OSError:
+                app.logger.debug('Failed to remove import session %s', entry.path)
+    if removed:
+        app.logger.info('Removed %d expired import session(s)', removed)
+    return removed
+
+
+def render_import_preview(token, meta, start=0):
+    """Render one page of valid rows (plus the first invalid rows) of a spooled import."""
+    per_page = app.config.get('IMPORT_PREVIEW_ROWS', 100)
+    start = max(0, min(start, max(meta['valid'] - 1, 0)))
+    results = read_import_rows(token, start, start + per_page, meta=meta)
+    errors = read_import_rows(token, 0, per_page, kind='error', meta=meta)
+    prev_start = max(start - per_page, 0) if start > 0 else None
+    next_start = start + per_page if start + per_page < meta['valid'] else None
+    return render_template('import_csv.html', preview=True, results=results, errors=errors, token=token,
+                           valid_count=meta['valid'], error_count=meta['invalid'],
+                           start=start, prev_start=prev_start, next_start=next_start)
+
+
 @app.route('/import_csv', methods=['GET','POST'])
 def import_csv():
     if 'user' not in session:
@@ -963,62 +2801,38 @@ def import_csv():
         if not f:
             flash('No file uploaded')
             return redirect(url_for('import_csv'))
+
+        if time.time() >= _next_import_sweep:
+            cleanup_import_sessions()
+
+        # Decode the upload incrementally and spool scored rows to disk
+        token = str(uuid.uuid4())
         try:
-            text = f.read().decode('utf-8')
-        except Exception:
+            lines = io.TextIOWrapper(f.stream, encoding='utf-8', newline='')
+            meta = spool_import(token, iter_import_rows(lines))
+        except UnicodeDecodeError:
+            discard_import(token)
             flash('Failed to read file. Ensure it is a CSV encoded in UTF-8.')
             return redirect(url_for('import_csv'))
 
-        reader = csv.DictReader(io.StringIO(text))
-        results = []
-        errors = []
-        for idx, row in enumerate(reader, start=1):
-            # Normalize keys to lowercase
-            row = {k.strip(): (v.strip() if v is not None else '') for k,v in row.items()}
-            name = row.get('name','').strip()
-            if not name:
-                errors.append({'row': idx, 'errors': ['missing name'], 'raw': row})
-                continue
-            def asfloat(x):
-                try:
-                    return float(x or 0)
-                except Exception:
-                    return None
-            activities = asfloat(row.get('activities',0))
-            quizzes = asfloat(row.get('quizzes',0))
-            performance_task = asfloat(row.get('performance_task',0))
-            exam = asfloat(row.get('exam',0))
-            attendance = asfloat(row.get('attendance',0))
-            if None in (activities, quizzes, performance_task, exam, attendance):
-                errors.append({'row': idx, 'errors': ['invalid numeric'], 'raw': row})
-                continue
-            written_works = (activities + quizzes) / 2
-            final_grade = round(written_works * 0.20 + performance_task * 0.50 + exam * 0.30, 2)
-            risk = 'Low Risk' if final_grade >= 76 else 'High Risk'
-            results.append({
-                'name': name,
-                'section': row.get('section',''),
-                'subject': row.get('subject',''),
-                'activities': activities,
-                'quizzes': quizzes,
-                'performance_task': performance_task,
-                'exam': exam,
-                'attendance': attendance,
-                'notes': row.get('notes',''),
-                'written_works': written_works,
-                'final_grade': final_grade,
-                'risk': risk
-            })
+        return render_import_preview(token, meta)
 
-        token = str(uuid.uuid4())
-        tmpdir = os.path.join(app.instance_path, 'imports')
-        os.makedirs(tmpdir, exist_ok=True)
-        with open(os.path.join(tmpdir, token + '.json'), 'w', encoding='utf-8') as fh:
-            json.dump({'results': results, 'errors': errors}, fh)
+    return render_template('import_csv.html')
 
-        return render_template('import_csv.html', preview=True, results=results, errors=errors, token=token)
 
-    return render_template('import_csv.html')
+@app.route('/import_csv/preview/<token>')
+def import_csv_preview(token):
+    if 'user' not in session:
+        return redirect(url_for('login'))
+    if session.get('role') not in ('Admin','Teacher'):
+        flash('Admin or Teacher access required.')
+        return redirect(url_for('dashboard'))
+
+    meta = load_import_meta(token)
+    if meta is None:
+        flash('Import session expired or invalid.')
+        return redirect(url_for('import_csv'))
+    return render_import_preview(token, meta, request.args.get('start', 0, type=int))
 
 
 @app.route('/import_csv/save/<token>', methods=['POST'])
@@ -1029,23 +2843,17 @@ def import_csv_save(token):
         flash('Admin or Teacher access required.')
         return redirect(url_for('dashboard'))
 
-    tmpdir = os.path.join(app.instance_path, 'imports')
-    path = os.path.join(tmpdir, token + '.json')
-    if not os.path.exists(path):
+    meta = load_import_meta(token)
+    if meta is None:
         flash('Import session expired or invalid.')
         return redirect(url_for('import_csv'))
 
-    with open(path, 'r', encoding='utf-8') as fh:
-        payload = json.load(fh)
-
-    results = payload.get('results', [])
-
     # Server-side confirmation fallback when JavaScript modal is not available
     if request.method == 'POST' and request.form.get('_requires_confirm') and not request.form.get('_confirmed'):
         hidden_items = {'_requires_confirm': '1'}
-        items = [r['name'] for r in results[:20]]
+        items = [r['name'] for r in read_import_rows(token, 0, 20, meta=meta)]
         token = create_confirm_session({
-            'message': f"Save {len(results)} student(s) to the database? This cannot be undone.",
+            'message': f"Save {meta['valid']} student(s) to the database? This cannot be undone.",
             'action': url_for('import_csv_save', token=token),
             'hidden_items': hidden_items,
             'cancel_url': url_for('import_csv'),
@@ -1053,104 +2861,55 @@ def import_csv_save(token):
         })
         return redirect(url_for('confirm_view', token=token), 303)
 
-    saved = 0
-    for r in results:
-        s = Student(
-            name=r['name'],
-            section=r.get('section',''),
-            subject=r.get('subject',''),
-            attendance=r.get('attendance',0),
-            activities=r.get('activities',0),
-            quizzes=r.get('quizzes',0),
-            notes=r.get('notes',''),
-            written_works=r.get('written_works',0),
-            performance_task=r.get('performance_task',0),
-            exam=r.get('exam',0),
-            final_grade=r.get('final_grade',0),
-            risk=r.get('risk',''),
-            added_by=session.get('user')
-        )
-        db.session.add(s)
-        try:
-            commit_with_retry()
-            saved += 1
-            try:
-                audit = Audit(action='create', user=session.get('user'), student_id=s.id, details=f'Imported student {s.name} via CSV')
-                db.session.add(audit)
-                try:
-                    commit_with_retry()
-                except OperationalError:
-                    pass
-            except Exception:
-                pass
-        except Exception as e:
-            db.session.rollback()
-
+    # Students, audit rows and stats are written in chunked transactions. Committed
+    # chunks are recorded in the meta so saving again after a partial failure only
+    # retries the chunks that failed.
+    committed = set(meta.get('committed_chunks', []))
+    chunk_size = meta.setdefault('save_chunk_size', app.config.get('IMPORT_CHUNK_SIZE', 500))
+
+    def mark_saved(start):
+        committed.add(start)
+        meta['committed_chunks'] = sorted(committed)
+        save_import_meta(token, meta)
+
+    saved, failed_chunks = bulk_insert_students(iter_import_results(token), session.get('user'), chunk_size,
+                                                skip_chunks=committed, on_chunk_saved=mark_saved)
+    if not failed_chunks:
+        discard_import(token)
     flash(f'Saved {saved} student(s)')
+    for first, last, _err in failed_chunks:
+        flash(f'Rows {first}-{last} could not be saved (database error). Please try importing them again.')
     return redirect(url_for('manage_students'))
 
 
 @app.route('/import_csv/download/<token>')
 def import_csv_download(token):
-    tmpdir = os.path.join(app.instance_path, 'imports')
-    path = os.path.join(tmpdir, token + '.json')
-    if not os.path.exists(path):
+    if load_import_meta(token) is None:
         flash('Import session expired or invalid.')
         return redirect(url_for('import_csv'))
 
-    with open(path, 'r', encoding='utf-8') as fh:
-        payload = json.load(fh)
-
-    results = payload.get('results', [])
-    # Build CSV
-    si = io.StringIO()
-    writer = csv.writer(si)
     header = ['name','section','subject','activities','quizzes','performance_task','exam','attendance','final_grade','risk','notes']
-    writer.writerow(header)
-    for r in results:
-        writer.writerow([r.get(k,'') for k in header])
-    out = si.getvalue()
-    from flask import Response
-    return Response(out, mimetype='text/csv', headers={
-        'Content-Disposition': f'attachment; filename=import_results_{token}.csv'
-    })
+    rows = ([r.get(k,'') for k in header] for r in iter_import_results(token))
+    return csv_download(header, rows, f'import_results_{token}.csv')
 
 # =========================
 # MAIN
 # =========================
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        # Create tables and apply pending schema migrations
+        init_db()
 
-        # --- Migration: ensure 'role' column exists in 'user' table ---
-        db_path = os.path.join(os.getcwd(), 'database.db')
-        if os.path.exists(db_path):
-            try:
-                conn = sqlite3.connect(db_path)
-                cur = conn.cursor()
-                cur.execute("PRAGMA table_info('user')")
-                cols = [row[1] for row in cur.fetchall()]
-                if 'role' not in cols:
-                    app.logger.info("Adding 'role' column to 'user' table (default: 'Teacher').")
-                    cur.execute("ALTER TABLE user ADD COLUMN role VARCHAR(20) DEFAULT 'Teacher'")
-                    conn.commit()
-                    # Refresh SQLAlchemy engine/session to pick up schema changes
-                    try:
-                        db.session.remove()
-                        db.engine.dispose()
-                    except Exception:
-                        pass
-            except Exception as e:
-                app.logger.exception('User table migration failed during startup')
-            finally:
-                conn.close()
+        # Rebuild dashboard summary counts from the student table
+        rebuild_student_stats()
 
-        # Ensure student assessment columns exist at startup
-        ensure_student_columns()
+        # Warm the risk model so the first request doesn't pay the load cost
+        risk_model.get()
 
-        # Cleanup old confirmation tokens on startup
+        # Cleanup old confirmation tokens and import previews on startup
         try:
             cleanup_confirm_sessions()
+            cleanup_import_sessions()
         except Exception:
             pass
 
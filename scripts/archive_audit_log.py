@@ -0,0 +1,106 @@
+import sys, os
+import argparse
+import gzip
+import json
+import logging
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, Audit, init_db, commit_with_retry
+from sqlalchemy import text, func
+
+# Note: archived rows are gone from the live audit table, and student_history() /
+# student_state_at() only replay what is left. A student whose 'create' row is
+# archived gets a truncated trail: student_history() flags it, and
+# student_state_at() cannot rebuild states older than the first remaining entry.
+# The gzip archive written here is the only record of those changes.
+parser = argparse.ArgumentParser(description='Move old audit rows into a compressed archive and summarize them. '
+                                             'Student history older than the cutoff can no longer be replayed.')
+parser.add_argument('--days', type=int, default=app.config['AUDIT_RETENTION_DAYS'], help='Keep audit rows newer than this many days')
+parser.add_argument('--batch-size', type=int, default=5000, help='Rows exported/deleted per batch')
+parser.add_argument('--vacuum', choices=['auto', 'incremental', 'full', 'none'], default='auto',
+                    help="Reclaim space afterwards: 'auto' uses incremental vacuum when enabled, else a full VACUUM")
+parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be archived')
+args = parser.parse_args()
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+# Roll the archived rows up into audit_summary, then delete them, in one transaction per batch
+SUMMARIZE_SQL = text("""
+    INSERT INTO audit_summary (period, user, action, count, first_timestamp, last_timestamp)
+    SELECT strftime('%Y-%m', timestamp), COALESCE(user, ''), COALESCE(action, ''), COUNT(*), MIN(timestamp), MAX(timestamp)
+    FROM audit WHERE id IN (SELECT id FROM audit WHERE timestamp < :cutoff AND id <= :max_id ORDER BY id LIMIT :n)
+    GROUP BY 1, 2, 3
+    ON CONFLICT (period, user, action) DO UPDATE SET
+        count = count + excluded.count,
+        first_timestamp = MIN(first_timestamp, excluded.first_timestamp),
+        last_timestamp = MAX(last_timestamp, excluded.last_timestamp)
+""")
+DELETE_SQL = text("DELETE FROM audit WHERE id IN (SELECT id FROM audit WHERE timestamp < :cutoff AND id <= :max_id ORDER BY id LIMIT :n)")
+
+with app.app_context():
+    init_db()
+
+    cutoff = datetime.utcnow() - timedelta(days=args.days)
+    old = Audit.query.filter(Audit.timestamp < cutoff)
+    total = old.count()
+    if not total:
+        logging.info('No audit rows older than %s; nothing to archive', cutoff.date())
+        raise SystemExit(0)
+    logging.info('%d audit row(s) older than %s', total, cutoff.date())
+    students = old.filter(Audit.student_id.isnot(None)).with_entities(func.count(func.distinct(Audit.student_id))).scalar()
+    if students:
+        logging.warning('History of %d student(s) will be truncated: states before %s can no longer be replayed',
+                        students, cutoff.date())
+    if args.dry_run:
+        raise SystemExit(0)
+
+    # 1) Export everything before the cutoff to a gzip NDJSON archive
+    bakdir = os.path.join(app.instance_path, 'backups')
+    os.makedirs(bakdir, exist_ok=True)
+    archive_name = os.path.join(bakdir, 'audit-archive-' + cutoff.strftime('%Y%m%d') + '-' + datetime.now().strftime('%Y%m%d%H%M%S') + '.ndjson.gz')
+    exported, last_id = 0, 0
+    with gzip.open(archive_name, 'wt', encoding='utf-8') as fh:
+        while True:
+            batch = old.filter(Audit.id > last_id).order_by(Audit.id).limit(args.batch_size).all()
+            if not batch:
+                break
+            for r in batch:
+                fh.write(json.dumps({'id': r.id, 'timestamp': r.timestamp.isoformat() if r.timestamp else None, 'user': r.user,
+                                     'action': r.action, 'student_id': r.student_id, 'details': r.details, 'changes': r.changes}) + '\n')
+            exported += len(batch)
+            last_id = batch[-1].id
+            db.session.expunge_all()
+    logging.info('Archived %d row(s) to %s', exported, archive_name)
+
+    # 2) Summarize and delete exactly the exported rows, in short transactions
+    deleted = 0
+    params = {'cutoff': cutoff, 'max_id': last_id, 'n': args.batch_size}
+    while True:
+        db.session.execute(SUMMARIZE_SQL, params)
+        n = db.session.execute(DELETE_SQL, params).rowcount
+        commit_with_retry()
+        if not n:
+            break
+        deleted += n
+    logging.info('Deleted %d archived row(s) from the audit table', deleted)
+
+    # 3) Give the freed pages back to the filesystem
+    db.session.remove()
+    raw = db.engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        auto_vacuum = cur.execute('PRAGMA auto_vacuum').fetchone()[0]
+        if args.vacuum == 'incremental' or (args.vacuum == 'auto' and auto_vacuum == 2):
+            cur.execute('PRAGMA incremental_vacuum').fetchall()
+            logging.info('Ran incremental vacuum')
+        elif args.vacuum in ('full', 'auto'):
+            # Switch to incremental auto-vacuum so later runs can skip the full rewrite
+            cur.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            cur.execute('VACUUM')
+            logging.info('Ran full VACUUM (auto_vacuum is now INCREMENTAL)')
+        cur.close()
+    finally:
+        raw.close()
+
+    logging.info('Done')
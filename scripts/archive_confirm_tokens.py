@@ -1,28 +1,44 @@
-import os, tarfile
+import sys, os, io, json, tarfile
 from datetime import datetime
 
-confdir = os.path.join('instance','confirm')
-if not os.path.exists(confdir):
-    print('No confirm dir')
-    raise SystemExit(0)
-files = [os.path.join(confdir,f) for f in os.listdir(confdir) if f.endswith('.json')]
-if not files:
-    print('No tokens to archive')
-    raise SystemExit(0)
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, ConfirmToken
 
-bakdir = os.path.join('instance','backups')
-os.makedirs(bakdir, exist_ok=True)
-archive_name = os.path.join(bakdir, 'confirm-archive-' + datetime.now().strftime('%Y%m%d%H%M%S') + '.tar.gz')
-print('Archiving', len(files), 'confirm tokens to', archive_name)
-with tarfile.open(archive_name, 'w:gz') as tar:
-    for f in files:
-        tar.add(f, arcname=os.path.basename(f))
+with app.app_context():
+    db.create_all()
+    table = ConfirmToken.__table__
+    with db.engine.connect() as conn:
+        rows = conn.execute(db.select(table).order_by(table.c.created)).all()
+    # Token files left in instance/confirm by older versions of the app
+    confdir = os.path.join(app.instance_path, 'confirm')
+    files = [os.path.join(confdir, f) for f in os.listdir(confdir) if f.endswith('.json')] if os.path.exists(confdir) else []
+    if not rows and not files:
+        print('No tokens to archive')
+        raise SystemExit(0)
+
+    bakdir = os.path.join(app.instance_path, 'backups')
+    os.makedirs(bakdir, exist_ok=True)
+    archive_name = os.path.join(bakdir, 'confirm-archive-' + datetime.now().strftime('%Y%m%d%H%M%S') + '.tar.gz')
+    print('Archiving', len(rows) + len(files), 'confirm tokens to', archive_name)
+    with tarfile.open(archive_name, 'w:gz') as tar:
+        for r in rows:
+            data = json.dumps(json.loads(r.payload)).encode('utf-8')
+            info = tarfile.TarInfo(r.token + '.json')
+            info.size = len(data)
+            info.mtime = int(r.created)
+            tar.addfile(info, io.BytesIO(data))
+        for f in files:
+            tar.add(f, arcname=os.path.basename(f))
 
-# remove originals
-for f in files:
-    try:
-        os.remove(f)
-    except Exception as e:
-        print('Failed to remove', f, e)
+    # remove originals
+    tokens = [r.token for r in rows]
+    with db.engine.begin() as conn:
+        for i in range(0, len(tokens), 500):
+            conn.execute(table.delete().where(table.c.token.in_(tokens[i:i + 500])))
+    for f in files:
+        try:
+            os.remove(f)
+        except Exception as e:
+            print('Failed to remove', f, e)
 
-print('Done')
\ No newline at end of file
+print('Done')
@@ -1,4 +1,4 @@
-import shutil, os, datetime, sys
+import shutil, os, datetime, sys, sqlite3
 
 src = os.path.join('instance','database.db')
 if not os.path.exists(src):
@@ -11,6 +11,15 @@ os.makedirs(bakdir, exist_ok=True)
 timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
 dst = os.path.join(bakdir, f'database.db.{timestamp}')
 
+# The app runs SQLite in WAL mode; fold the WAL into the main file before copying
+try:
+    conn = sqlite3.connect(src)
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    conn.close()
+except Exception as e:
+    print('WAL checkpoint failed:', e)
+    sys.exit(4)
+
 print('Backing up', src, '->', dst)
 shutil.copy2(src, dst)
 
@@ -0,0 +1,277 @@
+import sys, os
+import argparse
+import io
+import json
+import logging
+import platform
+import random
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+parser = argparse.ArgumentParser(description='Seed a scratch database and measure route latency through the test client.')
+parser.add_argument('--scales', default='10000', help='Comma-separated student counts to benchmark, e.g. 10000,100000,1000000')
+parser.add_argument('--requests', type=int, default=30, help='Timed requests per route')
+parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per route before measuring')
+parser.add_argument('--teachers', type=int, default=20, help='Teacher accounts the students are spread across')
+parser.add_argument('--memory-requests', type=int, default=3, help='Extra untimed requests per route traced for peak allocation')
+parser.add_argument('--import-rows', type=int, default=200, help='Rows in each CSV upload for the import routes')
+parser.add_argument('--database', default=None, help='Scratch SQLite file, recreated for each scale (default: a temporary directory removed afterwards)')
+parser.add_argument('--output', default=None, help='JSON results file (default: instance/benchmarks/routes-<timestamp>.json)')
+parser.add_argument('--baseline', default=None, help='Earlier results file; exit 1 if a route p95 regressed past --tolerance')
+parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 slowdown against the baseline (0.25 = 25%%)')
+parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic data')
+args = parser.parse_args()
+
+# The app picks its database file at import time
+scratch_dir = None
+if args.database is None:
+    scratch_dir = tempfile.mkdtemp(prefix='edupredict-bench-')
+    args.database = os.path.join(scratch_dir, 'benchmark.db')
+os.makedirs(os.path.dirname(os.path.abspath(args.database)), exist_ok=True)
+os.environ['EDUPREDICT_DATABASE'] = args.database
+sys.path.insert(0, ROOT)
+from sqlalchemy import event
+from app import app, db, init_db, invalidate_student_caches, encode_cursor, audit_sink, discard_import
+from generate_dataset import build_parser, generate
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+SECTIONS = [f'Section {i}' for i in range(1, 13)]
+SUBJECTS = ['math', 'science', 'english', 'history', 'filipino']
+PASSWORD = 'bench'
+
+
+def reset_database():
+    db.session.remove()
+    db.engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(args.database + suffix):
+            os.remove(args.database + suffix)
+    init_db()
+    invalidate_student_caches()
+
+
+def seed(n_students):
+    """Fill the scratch database with scripts/generate_dataset.py (bench_admin0, bench_t0.. accounts)."""
+    opts = build_parser().parse_args([
+        '--students', str(n_students), '--teachers', str(args.teachers), '--prefix', 'bench',
+        '--password', PASSWORD, '--sections', str(len(SECTIONS)), '--subjects', ','.join(SUBJECTS),
+        '--seed', str(args.seed)])
+    generate(opts)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def peak_alloc_kb(make_request, prepare=None, cleanup=None):
+    """Peak Python heap growth (KiB) over --memory-requests requests to one route.
+
+    Measured in a separate pass because tracemalloc slows the traced code down.
+    """
+    if args.memory_requests <= 0:
+        return None
+    tracemalloc.start()
+    try:
+        peak = 0
+        for _ in range(args.memory_requests):
+            arg = prepare() if prepare else None
+            audit_sink.flush()
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            rv = make_request(arg)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+            if cleanup:
+                cleanup(rv)
+    finally:
+        tracemalloc.stop()
+    return peak // 1024
+
+
+class QueryCounter:
+    """Counts SQL statements issued by the benchmarking thread (not the audit writer)."""
+
+    def __init__(self):
+        self.count = 0
+        self.thread = threading.get_ident()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self.thread:
+            self.count += 1
+
+
+def login(username):
+    client = app.test_client()
+    client.post('/', data={'username': username, 'password': PASSWORD})
+    return client
+
+
+def import_csv_body(rng):
+    out = io.StringIO()
+    out.write('name,section,subject,activities,quizzes,performance_task,exam,attendance,notes\n')
+    for i in range(args.import_rows):
+        out.write(f'Imported {i},{rng.choice(SECTIONS)},{rng.choice(SUBJECTS)},'
+                  f'{rng.randint(50, 100)},{rng.randint(50, 100)},{rng.randint(50, 100)},{rng.randint(40, 100)},{rng.randint(60, 100)},\n')
+    return out.getvalue().encode('utf-8')
+
+
+def upload(client, body):
+    return client.post('/import_csv', data={'file': (io.BytesIO(body), 'bench.csv')}, content_type='multipart/form-data')
+
+
+def import_token(rv):
+    return re.search(r'/import_csv/save/([0-9a-f-]+)', rv.get_data(as_text=True)).group(1)
+
+
+def discard_preview(rv):
+    """Remove the import session a preview spooled to instance/imports."""
+    discard_import(import_token(rv))
+
+
+def run_route(name, make_request, counter, prepare=None, cleanup=None):
+    """Time one route. `prepare` (untimed) returns the argument passed to make_request;
+    `cleanup` (untimed) is called with each response."""
+    for _ in range(args.warmup):
+        rv = make_request(prepare() if prepare else None)
+        if cleanup:
+            cleanup(rv)
+    timings, queries = [], []
+    for _ in range(args.requests):
+        arg = prepare() if prepare else None
+        audit_sink.flush()
+        counter.count = 0
+        started = time.perf_counter()
+        rv = make_request(arg)
+        timings.append((time.perf_counter() - started) * 1000.0)
+        queries.append(counter.count)
+        if rv.status_code >= 400:
+            raise RuntimeError(f'{name} returned HTTP {rv.status_code}')
+        if cleanup:
+            cleanup(rv)
+    timings.sort()
+    result = {
+        'requests': len(timings),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'max_ms': round(timings[-1], 3),
+        'queries_per_request': round(sum(queries) / len(queries), 2),
+        'peak_alloc_kb': peak_alloc_kb(make_request, prepare, cleanup),
+    }
+    logging.info('  %-22s p50 %8.2f ms  p95 %8.2f ms  p99 %8.2f ms  %5.1f queries  %s KiB peak', name,
+                 result['p50_ms'], result['p95_ms'], result['p99_ms'], result['queries_per_request'],
+                 result['peak_alloc_kb'] if result['peak_alloc_kb'] is not None else '-')
+    return result
+
+
+def benchmark_scale(n_students, rng):
+    reset_database()
+    started = time.perf_counter()
+    seed(n_students)
+    seed_seconds = time.perf_counter() - started
+    logging.info('Seeded %d students in %.1fs', n_students, seed_seconds)
+
+    counter = QueryCounter()
+    event.listen(db.engine, 'before_cursor_execute', counter)
+    admin = login('bench_admin0')
+    teacher = login('bench_t0')
+    deep_cursor = encode_cursor('after', max(n_students - 50, 0))
+    csv_body = import_csv_body(rng)
+    form = {'name': 'Bench Predict', 'attendance': '90', 'activities': '80', 'quizzes': '80',
+            'performance_task': '80', 'exam': '80', 'section': SECTIONS[0], 'subject': SUBJECTS[0]}
+
+    def preview_token():
+        return import_token(upload(teacher, csv_body))
+
+    routes = [
+        ('dashboard_admin', lambda _: admin.get('/dashboard'), None),
+        ('dashboard_teacher', lambda _: teacher.get('/dashboard'), None),
+        ('students_first_page', lambda _: admin.get('/admin/students'), None),
+        ('students_deep_page', lambda _: admin.get('/admin/students', query_string={'cursor': deep_cursor}), None),
+        ('students_filtered', lambda _: admin.get('/admin/students', query_string={'section': SECTIONS[3], 'risk': 'High Risk'}), None),
+        ('students_search', lambda _: admin.get('/admin/students', query_string={'q': 'Student 12'}), None),
+        ('sections', lambda _: admin.get('/sections'), None),
+        ('sections_expanded', lambda _: admin.get('/sections', query_string={'section': SECTIONS[1]}), None),
+        ('predict', lambda _: teacher.post('/predict', data=form), None),
+        ('import_preview', lambda _: upload(teacher, csv_body), None),
+        ('import_save', lambda token: teacher.post(f'/import_csv/save/{token}'), preview_token),
+    ]
+    cleanups = {'import_preview': discard_preview}
+    results = {}
+    try:
+        for name, make_request, prepare in routes:
+            results[name] = run_route(name, make_request, counter, prepare, cleanups.get(name))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', counter)
+    return {'students': n_students, 'seed_seconds': round(seed_seconds, 2), 'routes': results}
+
+
+def compare(results, baseline_path):
+    """Return (scale, route, old p95, new p95) for every route slower than the tolerance allows."""
+    with open(baseline_path, 'r', encoding='utf-8') as fh:
+        baseline = json.load(fh)
+    regressions = []
+    for scale, data in results['scales'].items():
+        old_routes = baseline.get('scales', {}).get(scale, {}).get('routes', {})
+        for route, stats in data['routes'].items():
+            old = old_routes.get(route)
+            if old and stats['p95_ms'] > old['p95_ms'] * (1 + args.tolerance):
+                regressions.append((scale, route, old['p95_ms'], stats['p95_ms']))
+    return regressions
+
+
+if __name__ == '__main__':
+    rng = random.Random(args.seed)
+    scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'teachers': args.teachers,
+            'import_rows': args.import_rows,
+            'seed': args.seed,
+        },
+        'scales': {},
+    }
+    app.logger.setLevel(logging.WARNING)
+    with app.app_context():
+        try:
+            for n in scales:
+                logging.info('Benchmarking with %d students', n)
+                results['scales'][str(n)] = benchmark_scale(n, rng)
+            audit_sink.flush()
+        finally:
+            db.session.remove()
+            db.engine.dispose()
+            if scratch_dir:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(app.instance_path, 'benchmarks', 'routes-' + datetime.now().strftime('%Y%m%d%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as fh:
+        json.dump(results, fh, indent=2)
+    logging.info('Wrote %s', output)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline)
+        for scale, route, old, new in regressions:
+            logging.info('REGRESSION %s students / %s: p95 %.2f ms -> %.2f ms', scale, route, old, new)
+        if regressions:
+            raise SystemExit(1)
+        logging.info('No p95 regressions against %s', args.baseline)
@@ -0,0 +1,98 @@
+import sys, os
+import argparse
+import logging
+import re
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import (app, db, Student, StudentStats, init_db,
+                 visible_students_query, apply_student_filters, explain_query_plan, _section_filter,
+                 section_summary_query, keyset_query)
+from sqlalchemy import select, func
+
+parser = argparse.ArgumentParser(description="Run EXPLAIN QUERY PLAN on each route's student queries and flag full table scans.")
+parser.add_argument('--user', type=str, help='Teacher username to use in owner-scoped queries (default: any existing owner)')
+args = parser.parse_args()
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+# "SCAN student" without an index is a full table scan; "SEARCH ... USING INDEX" is a lookup
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?!.*\bINDEX\b)')
+
+
+def count_of(query):
+    return select(func.count()).select_from(query.order_by(None).subquery())
+
+
+def page_of(query):
+    return query.order_by(Student.id).limit(10).statement
+
+
+def facet(column, owner=None):
+    q = db.session.query(column)
+    if owner is not None:
+        q = q.filter(Student.added_by == owner)
+    return q.distinct().statement
+
+
+with app.app_context():
+    init_db()
+
+    owner = args.user or db.session.scalar(select(Student.added_by).limit(1)) or 'teacher'
+    sec = db.session.scalar(select(Student.section).where(Student.section != '').limit(1)) or 'Section A'
+    subj = db.session.scalar(select(Student.subject).where(Student.subject != '').limit(1)) or 'math'
+    teacher = visible_students_query('Teacher', owner)
+    admin = visible_students_query('Admin', owner)
+    teacher_sec = apply_student_filters(teacher, section=sec)
+    admin_sec = apply_student_filters(admin, section=sec)
+
+    # (route, description, statement, scan_expected)
+    checks = [
+        ('dashboard', 'teacher counts', select(func.sum(StudentStats.total), func.sum(StudentStats.at_risk)).where(StudentStats.added_by == owner), False),
+        ('manage_students', 'teacher count', count_of(teacher), False),
+        ('manage_students', 'teacher page', page_of(teacher), False),
+        ('manage_students', 'teacher section filter', page_of(apply_student_filters(teacher, section=sec)), False),
+        ('manage_students', 'teacher subject filter', page_of(apply_student_filters(teacher, subject=subj)), False),
+        ('manage_students', 'teacher risk filter', page_of(apply_student_filters(teacher, risk='High Risk')), False),
+        ('manage_students', 'teacher section facets', facet(Student.section, owner), False),
+        ('manage_students', 'teacher subject facets', facet(Student.subject, owner), False),
+        ('manage_students', 'admin page', page_of(admin), True),
+        ('manage_students', 'admin section filter', page_of(apply_student_filters(admin, section=sec)), False),
+        ('manage_students', 'admin subject filter', page_of(apply_student_filters(admin, subject=subj)), False),
+        ('manage_students', 'admin section facets', facet(Student.section), False),
+        ('manage_students', 'admin subject facets', facet(Student.subject), False),
+        ('manage_students', 'admin name search', page_of(apply_student_filters(admin, q='a')), True),
+        ('sections', 'teacher students', apply_student_filters(teacher).statement, False),
+        ('sections', 'teacher unassigned section', apply_student_filters(teacher, section='Unassigned').statement, False),
+        ('sections', 'admin one section', admin_sec.statement, False),
+        ('sections', 'teacher section summary', section_summary_query('Teacher', owner).statement, False),
+        ('sections', 'teacher filtered summary', section_summary_query('Teacher', owner, subject=subj).statement, False),
+        # Unfiltered admin headers scan the small owner x section summary table, never the students
+        ('sections', 'admin section summary', section_summary_query('Admin', owner).statement, True),
+        ('sections', 'admin filtered summary', section_summary_query('Admin', owner, subject=subj).statement, False),
+        ('sections', 'teacher first page', keyset_query(teacher_sec, 25).statement, False),
+        ('sections', 'teacher seek after', keyset_query(teacher_sec, 25, 'after', 1).statement, False),
+        ('sections', 'teacher seek before', keyset_query(teacher_sec, 25, 'before', 1000).statement, False),
+        ('sections', 'admin seek after', keyset_query(admin_sec, 25, 'after', 1).statement, False),
+        ('sections', 'admin seek before', keyset_query(admin_sec, 25, 'before', 1000).statement, False),
+        ('delete_section_students', 'owner section count', count_of(Student.query.filter(Student.added_by == owner, _section_filter(Student.section, sec))), False),
+    ]
+
+    unexpected = 0
+    for route, desc, stmt, scan_expected in checks:
+        plan = explain_query_plan(stmt)
+        scans = [line for line in plan if FULL_SCAN.match(line)]
+        if scans and not scan_expected:
+            status = 'FULL SCAN'
+            unexpected += 1
+        elif scans:
+            status = 'scan (expected)'
+        else:
+            status = 'ok'
+        logging.info('[%s] %-28s %s', route, desc, status)
+        for line in plan:
+            logging.info('      %s', line)
+
+    if unexpected:
+        logging.warning('%d quer%s fell back to a full table scan', unexpected, 'y' if unexpected == 1 else 'ies')
+        sys.exit(1)
+    logging.info('All route queries use indexes')
@@ -0,0 +1,229 @@
+import sys, os
+import argparse
+import csv
+import json
+import logging
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SUBJECTS = 'math,science,english,history,filipino'
+STUDENT_COLUMNS = ('id', 'name', 'attendance', 'activities', 'quizzes', 'performance_task', 'exam', 'written_works',
+                   'final_grade', 'risk', 'risk_score', 'notes', 'section', 'subject', 'added_by')
+CSV_COLUMNS = ['name', 'section', 'subject', 'activities', 'quizzes', 'performance_task', 'exam', 'attendance', 'notes']
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Write seeded, reproducible User/Student/Audit rows straight into the SQLite schema.')
+    parser.add_argument('--students', type=int, default=100000, help='Students to generate')
+    parser.add_argument('--teachers', type=int, default=50, help='Teacher accounts the students are spread across')
+    parser.add_argument('--admins', type=int, default=1, help='Admin accounts')
+    parser.add_argument('--prefix', default='gen', help='Username prefix: <prefix>_t0.., <prefix>_admin0..')
+    parser.add_argument('--password', default='password', help='Password for every generated account')
+    parser.add_argument('--sections', type=int, default=12, help='Number of sections (Section 1..N)')
+    parser.add_argument('--section-skew', type=float, default=0.0, help='Zipf exponent for section sizes (0 = uniform)')
+    parser.add_argument('--subjects', default=DEFAULT_SUBJECTS, help='Comma-separated subject names')
+    parser.add_argument('--subject-skew', type=float, default=0.0, help='Zipf exponent for subject popularity (0 = uniform)')
+    parser.add_argument('--grade-mean', type=float, default=80.0, help='Mean student ability (0-100)')
+    parser.add_argument('--grade-std', type=float, default=10.0, help='Spread of ability between students')
+    parser.add_argument('--grade-noise', type=float, default=5.0, help='Spread of each assessment around the ability')
+    parser.add_argument('--attendance-mean', type=float, default=90.0, help='Mean attendance (0-100)')
+    parser.add_argument('--attendance-std', type=float, default=8.0, help='Spread of attendance')
+    parser.add_argument('--audits-per-student', type=float, default=1.0,
+                        help="Audit rows per student: one 'create' each, the remainder as field updates")
+    parser.add_argument('--days', type=int, default=365, help='Audit timestamps are spread over this many past days')
+    parser.add_argument('--risk-scores', action='store_true', help='Fill risk_score with the trained model (slower)')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows per executemany/transaction')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed and options -> same data)')
+    parser.add_argument('--keep-indexes', action='store_true',
+                        help='Load with the student/audit indexes in place (default: drop them and rebuild after loading)')
+    parser.add_argument('--reset', action='store_true', help='Delete existing users, students and audit rows first')
+    parser.add_argument('--csv', default=None, help='Also write an import-format CSV to this path')
+    parser.add_argument('--csv-rows', type=int, default=10000, help='Rows in the CSV file')
+    parser.add_argument('--database', default=None, help='SQLite file to fill (default: the app database)')
+    return parser
+
+
+def weights(n, skew):
+    w = 1.0 / np.arange(1, n + 1) ** skew
+    return w / w.sum()
+
+
+def assessments(rng, n, opts):
+    """Per-student ability plus noise for each component, clipped to 0-100 and rounded to 0.1."""
+    ability = rng.normal(opts.grade_mean, opts.grade_std, n)
+
+    def component():
+        return np.round(np.clip(ability + rng.normal(0, opts.grade_noise, n), 0, 100), 1)
+    activities, quizzes, performance_task, exam = component(), component(), component(), component()
+    attendance = np.round(np.clip(rng.normal(opts.attendance_mean, opts.attendance_std, n), 0, 100), 1)
+    return attendance, activities, quizzes, performance_task, exam
+
+
+def pick(rng, names, skew, n):
+    return np.asarray(names, dtype=object)[rng.choice(len(names), size=n, p=weights(len(names), skew))]
+
+
+def generate_users(cur, opts):
+    from werkzeug.security import generate_password_hash
+    pw = generate_password_hash(opts.password)
+    users = [(f'{opts.prefix}_admin{i}', pw, 'Admin') for i in range(opts.admins)]
+    users += [(f'{opts.prefix}_t{i}', pw, 'Teacher') for i in range(opts.teachers)]
+    cur.executemany('INSERT INTO user (username, password, role) VALUES (?, ?, ?)', users)
+    return [u[0] for u in users if u[2] == 'Teacher']
+
+
+def generate_students(cur, conn, rng, opts, teachers, score_batch, risk_model=None):
+    """Insert opts.students rows in chunks; returns (first_id, owners) for audit generation."""
+    # Ids are assigned here (so audits can reference them) but must never reuse a
+    # deleted student's id: start past the AUTOINCREMENT sequence and every audited id.
+    first_id = cur.execute(
+        "SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'student'), 0), "
+        "COALESCE((SELECT MAX(id) FROM student), 0), COALESCE((SELECT MAX(student_id) FROM audit), 0))"
+    ).fetchone()[0] + 1
+    sections = [f'Section {i}' for i in range(1, opts.sections + 1)]
+    subjects = [s.strip() for s in opts.subjects.split(',') if s.strip()]
+    placeholders = ', '.join('?' * len(STUDENT_COLUMNS))
+    sql = f'INSERT INTO student ({", ".join(STUDENT_COLUMNS)}) VALUES ({placeholders})'
+    owners = np.arange(opts.students) % len(teachers)
+    for start in range(0, opts.students, opts.chunk_size):
+        n = min(opts.chunk_size, opts.students - start)
+        attendance, activities, quizzes, performance_task, exam = assessments(rng, n, opts)
+        written_works, final_grade, risk = score_batch(activities, quizzes, performance_task, exam)
+        risk_score = (risk_model.predict_proba(attendance, final_grade) if risk_model else None) or [None] * n
+        ids = range(first_id + start, first_id + start + n)
+        rows = zip(ids, [f'Student {i}' for i in ids], attendance.tolist(), activities.tolist(), quizzes.tolist(),
+                   performance_task.tolist(), exam.tolist(), written_works, final_grade, risk, risk_score,
+                   [''] * n, pick(rng, sections, opts.section_skew, n).tolist(),
+                   pick(rng, subjects, opts.subject_skew, n).tolist(),
+                   [teachers[o] for o in owners[start:start + n]])
+        cur.executemany(sql, rows)
+        conn.commit()
+        logging.info('  students: %d/%d', start + n, opts.students)
+    return first_id, [teachers[o] for o in owners]
+
+
+def _timestamps(now, seconds_ago):
+    stamps = (np.datetime64(now, 'us') - (seconds_ago * 1e6).astype('timedelta64[us]')).astype(str)
+    return np.char.replace(stamps, 'T', ' ').tolist()
+
+
+def generate_audits(cur, conn, rng, opts, first_id, owners):
+    """One 'create' per student plus field-level 'update' rows, spread over opts.days."""
+    if opts.audits_per_student <= 0:
+        return 0
+    now = datetime.utcnow()
+    span = opts.days * 86400.0
+    sql = 'INSERT INTO audit (action, user, student_id, timestamp, details, changes) VALUES (?, ?, ?, ?, ?, ?)'
+    created_ago = rng.uniform(0, span, opts.students)
+    written = 0
+    for start in range(0, opts.students, opts.chunk_size):
+        end = min(start + opts.chunk_size, opts.students)
+        ids = range(first_id + start, first_id + end)
+        cur.executemany(sql, zip(['create'] * (end - start), owners[start:end], ids,
+                                 _timestamps(now, created_ago[start:end]),
+                                 [f'Created student Student {i}' for i in ids], [None] * (end - start)))
+        conn.commit()
+        written += end - start
+    updates = int(round(opts.students * (opts.audits_per_student - 1)))
+    for start in range(0, updates, opts.chunk_size):
+        n = min(opts.chunk_size, updates - start)
+        who = rng.integers(0, opts.students, n)
+        ago = created_ago[who] * rng.uniform(0, 1, n)  # always after the student was created
+        old = np.round(rng.uniform(40, 100, n), 1)
+        new = np.round(np.clip(old + rng.normal(0, 8, n), 0, 100), 1)
+        changes = [json.dumps({'exam': [o, w]}, separators=(',', ':')) for o, w in zip(old.tolist(), new.tolist())]
+        cur.executemany(sql, zip(['update'] * n, [owners[i] for i in who.tolist()], (who + first_id).tolist(),
+                                 _timestamps(now, ago), [None] * n, changes))
+        conn.commit()
+        written += n
+    return written
+
+
+def write_csv(path, rng, opts):
+    attendance, activities, quizzes, performance_task, exam = assessments(rng, opts.csv_rows, opts)
+    sections = pick(rng, [f'Section {i}' for i in range(1, opts.sections + 1)], opts.section_skew, opts.csv_rows)
+    subjects = pick(rng, [s.strip() for s in opts.subjects.split(',') if s.strip()], opts.subject_skew, opts.csv_rows)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(CSV_COLUMNS)
+        writer.writerows(zip([f'Import Student {i}' for i in range(opts.csv_rows)], sections.tolist(), subjects.tolist(),
+                             activities.tolist(), quizzes.tolist(), performance_task.tolist(), exam.tolist(),
+                             attendance.tolist(), [''] * opts.csv_rows))
+
+
+def drop_indexes(cur, models):
+    for model in models:
+        for index in model.__table__.indexes:
+            cur.execute(f'DROP INDEX IF EXISTS {index.name}')
+
+
+def create_indexes(cur, models):
+    for model in models:
+        for index in model.__table__.indexes:
+            cols = ', '.join(c.name for c in index.columns)
+            cur.execute(f'CREATE INDEX IF NOT EXISTS {index.name} ON {model.__tablename__} ({cols})')
+
+
+def generate(opts):
+    """Fill the app database according to `opts` (an argparse namespace). Returns a summary dict."""
+    from app import (app, db, Student, Audit, init_db, score_batch, risk_model, rebuild_student_stats,
+                     invalidate_student_caches)
+    if opts.students and opts.teachers < 1:
+        raise SystemExit('At least one teacher is needed to own the students')
+    rng = np.random.default_rng(opts.seed)
+    summary = {}
+    with app.app_context():
+        init_db()
+        raw = db.engine.raw_connection()
+        cur = raw.cursor()
+        try:
+            if opts.reset:
+                for table in ('audit', 'audit_summary', 'student', 'student_stats', 'user'):
+                    cur.execute(f'DELETE FROM {table}')
+                raw.commit()
+            # Bulk-load settings for this connection only; sorting each index once at
+            # the end is much cheaper than updating it row by row
+            cur.execute('PRAGMA synchronous = OFF')
+            if not opts.keep_indexes:
+                drop_indexes(cur, (Student, Audit))
+            started = time.perf_counter()
+            teachers = generate_users(cur, opts)
+            raw.commit()
+            first_id, owners = generate_students(cur, raw, rng, opts, teachers, score_batch,
+                                                 risk_model if opts.risk_scores else None)
+            summary['students_seconds'] = round(time.perf_counter() - started, 2)
+            started = time.perf_counter()
+            summary['audits'] = generate_audits(cur, raw, rng, opts, first_id, owners)
+            summary['audits_seconds'] = round(time.perf_counter() - started, 2)
+        finally:
+            raw.rollback()
+            started = time.perf_counter()
+            create_indexes(cur, (Student, Audit))
+            raw.commit()
+            summary['index_seconds'] = round(time.perf_counter() - started, 2)
+            cur.execute('PRAGMA synchronous = NORMAL')
+            cur.close()
+            raw.close()
+        rebuild_student_stats()
+        invalidate_student_caches()
+    summary.update({'users': opts.teachers + opts.admins, 'students': opts.students})
+    if opts.csv:
+        write_csv(opts.csv, rng, opts)
+        summary['csv'] = opts.csv
+    return summary
+
+
+if __name__ == '__main__':
+    opts = build_parser().parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if opts.database:
+        # The app picks its database file at import time
+        os.environ['EDUPREDICT_DATABASE'] = os.path.abspath(opts.database)
+    sys.path.insert(0, ROOT)
+    started = time.perf_counter()
+    summary = generate(opts)
+    logging.info('Generated %s in %.1fs', summary, time.perf_counter() - started)
@@ -0,0 +1,98 @@
+import sys, os
+import argparse
+import json
+import logging
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import (app, db, Student, Audit, init_db, score_batch, risk_model, rebuild_student_stats, commit_with_retry,
+                 diff_fields, encode_changes)
+from sqlalchemy import select, update, insert
+
+parser = argparse.ArgumentParser(description='Recompute final_grade, risk and risk_score for every student.')
+parser.add_argument('--chunk-size', type=int, default=2000, help='Rows read, scored and updated per transaction')
+parser.add_argument('--checkpoint', type=str, default=os.path.join(app.instance_path, 'rescore_checkpoint.json'),
+                    help='File recording the last re-scored student id (used to resume)')
+parser.add_argument('--restart', action='store_true', help='Ignore any existing checkpoint and start from the first student')
+parser.add_argument('--no-model', action='store_true', help='Only recompute grades and threshold risk; leave risk_score untouched')
+args = parser.parse_args()
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+
+def write_checkpoint(last_id, done):
+    tmp = args.checkpoint + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump({'last_id': last_id, 'rows': done}, fh)
+    os.replace(tmp, args.checkpoint)
+
+
+with app.app_context():
+    init_db()
+
+    last_id, done = 0, 0
+    if os.path.exists(args.checkpoint) and not args.restart:
+        with open(args.checkpoint, 'r', encoding='utf-8') as fh:
+            state = json.load(fh)
+        last_id, done = state.get('last_id', 0), state.get('rows', 0)
+        logging.info('Resuming after student id %d (%d rows already done)', last_id, done)
+    os.makedirs(os.path.dirname(args.checkpoint) or '.', exist_ok=True)
+
+    cols = select(Student.id, Student.attendance, Student.activities, Student.quizzes, Student.performance_task, Student.exam,
+                  Student.written_works, Student.final_grade, Student.risk, Student.risk_score)
+    started = time.perf_counter()
+    this_run = 0
+    while True:
+        # Keyset pagination: each chunk is an index range scan on the primary key
+        rows = db.session.execute(cols.where(Student.id > last_id).order_by(Student.id).limit(args.chunk_size)).all()
+        if not rows:
+            break
+
+        attendance = [r.attendance or 0 for r in rows]
+        written_works, final_grades, risks = score_batch(
+            [r.activities or 0 for r in rows], [r.quizzes or 0 for r in rows],
+            [r.performance_task or 0 for r in rows], [r.exam or 0 for r in rows])
+        params = [
+            {'id': r.id, 'written_works': ww, 'final_grade': fg, 'risk': risk}
+            for r, ww, fg, risk in zip(rows, written_works, final_grades, risks)
+        ]
+        # An unavailable model returns None: keep the stored risk_score rather than clearing it
+        scores = None if args.no_model else risk_model.predict_proba(attendance, final_grades)
+        if scores is not None:
+            for p, score in zip(params, scores):
+                p['risk_score'] = score
+
+        # Audit what actually changed so student_state_at() can undo the re-score
+        audits = []
+        for r, p in zip(rows, params):
+            after = {k: v for k, v in p.items() if k != 'id'}
+            changes = diff_fields({k: getattr(r, k) for k in after}, after)
+            if changes:
+                audits.append({'action': 'update', 'user': 'system', 'student_id': r.id,
+                               'details': 'Re-scored student', 'changes': encode_changes(changes)})
+
+        # Bulk UPDATE by primary key plus the audit rows; one short write transaction per chunk
+        try:
+            db.session.execute(update(Student), params)
+            if audits:
+                db.session.execute(insert(Audit), audits)
+            commit_with_retry()
+        except Exception:
+            db.session.rollback()
+            logging.exception('Failed to update students %d-%d; re-run to resume from the checkpoint', rows[0].id, rows[-1].id)
+            sys.exit(2)
+
+        last_id = rows[-1].id
+        done += len(rows)
+        this_run += len(rows)
+        write_checkpoint(last_id, done)
+        elapsed = time.perf_counter() - started
+        logging.info('Re-scored %d rows (last id %d, %.0f rows/s)', done, last_id, this_run / elapsed if elapsed else 0)
+
+    # Risk labels may have changed, so rebuild the dashboard summary counts
+    rebuild_student_stats()
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    elapsed = time.perf_counter() - started
+    logging.info('Re-score complete: %d rows in %.1fs (%.0f rows/s)', this_run, elapsed, this_run / elapsed if elapsed else 0)
@@ -3,7 +3,7 @@ import argparse
 import logging
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from app import app, db, User, Student, Audit, add_role_column_if_missing, ensure_student_columns
+from app import app, db, User, init_db, clear_all_tables
 from werkzeug.security import generate_password_hash
 
 parser = argparse.ArgumentParser(description='Reset the application database (destructive).')
@@ -18,28 +18,20 @@ if not args.yes:
 
 with app.app_context():
     # Ensure schema exists and migrations applied
-    db.create_all()
-    add_role_column_if_missing()
-    ensure_student_columns()
+    init_db()
 
-    u_count = User.query.count()
-    s_count = Student.query.count()
-    a_count = Audit.query.count()
+    logging.warning('About to delete all data from every table')
 
-    logging.warning(f'About to delete all data: Users={u_count}, Students={s_count}, Audits={a_count}')
-
-    # Delete all rows
+    # Delete all rows (users, students, audit log and summaries, sessions, confirm tokens, stats)
     try:
-        Audit.query.delete()
-        Student.query.delete()
-        User.query.delete()
+        deleted = clear_all_tables()
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         logging.exception('Failed to delete rows during reset_db')
         sys.exit(2)
 
-    logging.info('All tables cleared.')
+    logging.info('All tables cleared: %s', ', '.join(f'{name}={n}' for name, n in sorted(deleted.items())))
 
     # Recreate admin if requested
     if args.admin_username and args.admin_password is not None:
@@ -0,0 +1,50 @@
+import sys, os
+import glob
+import gzip
+import json
+import logging
+import subprocess
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, Audit, AuditSummary, init_db
+
+with app.app_context():
+    init_db()
+    # Cleanup
+    Audit.query.filter(Audit.user.in_(['aa_old', 'aa_new'])).delete(synchronize_session=False)
+    AuditSummary.query.filter(AuditSummary.user.in_(['aa_old', 'aa_new'])).delete(synchronize_session=False)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    db.session.add_all([Audit(action='create', user='aa_old', student_id=i, timestamp=now - timedelta(days=500 + i), details='old') for i in range(50)])
+    db.session.add_all([Audit(action='update', user='aa_new', student_id=i, timestamp=now, details='new') for i in range(5)])
+    db.session.commit()
+    before = set(glob.glob(os.path.join(app.instance_path, 'backups', 'audit-archive-*.ndjson.gz')))
+
+script = os.path.join(os.path.dirname(__file__), 'archive_audit_log.py')
+out = subprocess.run([sys.executable, script, '--days', '365', '--batch-size', '7'], check=True, capture_output=True, text=True)
+assert 'student(s) will be truncated' in out.stderr, out.stderr
+
+with app.app_context():
+    db.session.rollback()
+    assert Audit.query.filter_by(user='aa_old').count() == 0, 'Old rows should be removed from the live table'
+    assert Audit.query.filter_by(user='aa_new').count() == 5, 'Recent rows must be kept'
+
+    summary = AuditSummary.query.filter_by(user='aa_old', action='create').all()
+    assert sum(s.count for s in summary) == 50
+    logging.info('Summary periods: %s', [(s.period, s.count) for s in summary])
+
+    archives = set(glob.glob(os.path.join(app.instance_path, 'backups', 'audit-archive-*.ndjson.gz'))) - before
+    assert len(archives) == 1, f'Expected one new archive, got {archives}'
+    archive = archives.pop()
+    with gzip.open(archive, 'rt', encoding='utf-8') as fh:
+        archived = [json.loads(line) for line in fh]
+    assert sum(1 for r in archived if r['user'] == 'aa_old') == 50
+
+    # Cleanup
+    os.remove(archive)
+    Audit.query.filter(Audit.user.in_(['aa_old', 'aa_new'])).delete(synchronize_session=False)
+    AuditSummary.query.filter(AuditSummary.user.in_(['aa_old', 'aa_new'])).delete(synchronize_session=False)
+    db.session.commit()
+
+print('Audit archive test OK')
@@ -0,0 +1,139 @@
+import sys, os
+import json
+import logging
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, User, Student, Audit, audit_sink, student_history, student_state_at, _migrate_student_autoincrement
+from sqlalchemy import create_engine, func, update
+
+FORM = {'name': 'AH_A', 'attendance': '90', 'activities': '80', 'quizzes': '80', 'performance_task': '80', 'exam': '80', 'section': 'S1', 'subject': 'math'}
+
+
+def checkpoint():
+    time.sleep(0.01)
+    t = datetime.utcnow()
+    time.sleep(0.01)
+    return t
+
+
+# Migration 7 rebuilds a legacy student table with AUTOINCREMENT and starts the
+# sequence past every id seen in the audit log.
+engine = create_engine('sqlite://')
+with engine.begin() as conn:
+    conn.exec_driver_sql("CREATE TABLE student (id INTEGER NOT NULL, name VARCHAR(100), attendance FLOAT, grade FLOAT, "
+                         "activities FLOAT, quizzes FLOAT, notes TEXT, written_works FLOAT, performance_task FLOAT, "
+                         "exam FLOAT, final_grade FLOAT, risk VARCHAR(50), added_by VARCHAR(100), section VARCHAR(100), "
+                         "subject VARCHAR(50), risk_score FLOAT, PRIMARY KEY (id))")
+    conn.exec_driver_sql("CREATE TABLE audit (id INTEGER PRIMARY KEY, student_id INTEGER)")
+    conn.exec_driver_sql("INSERT INTO student (id, name, exam) VALUES (3, 'kept', 70)")
+    conn.exec_driver_sql("INSERT INTO audit (student_id) VALUES (3), (9)")
+    with app.app_context():
+        _migrate_student_autoincrement(conn)
+    ddl = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'student'").scalar()
+    assert 'AUTOINCREMENT' in ddl, ddl
+    assert conn.exec_driver_sql("SELECT name, exam FROM student WHERE id = 3").first() == ('kept', 70)
+    indexes = {r[0] for r in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'student'")}
+    assert 'ix_student_added_by_id' in indexes, indexes
+    conn.exec_driver_sql("INSERT INTO student (name) VALUES ('new')")
+    assert conn.exec_driver_sql("SELECT MAX(id) FROM student").scalar() == 10
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['ah_t1'])).delete(synchronize_session=False)
+    Student.query.filter(Student.added_by.in_(['ah_t1'])).delete(synchronize_session=False)
+    Audit.query.filter(Audit.user.in_(['ah_t1', 'ah_old'])).delete(synchronize_session=False)
+    db.session.commit()
+    audit_floor = db.session.scalar(func.max(Audit.id)) or 0
+
+    client = app.test_client()
+    client.post('/register', data={'username': 'ah_t1', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    client.post('/', data={'username': 'ah_t1', 'password': 'p'}, follow_redirects=True)
+
+    before_create = checkpoint()
+    client.post('/predict', data=FORM, follow_redirects=True)
+    s = Student.query.filter_by(name='AH_A', added_by='ah_t1').first()
+    sid = s.id
+    after_create = checkpoint()
+    client.post(f'/admin/students/edit/{sid}', data=dict(FORM, exam='60'), follow_redirects=True)
+    after_edit1 = checkpoint()
+    client.post(f'/admin/students/edit/{sid}', data=dict(FORM, exam='60', section='S2'), follow_redirects=True)
+    # Saving without changes records nothing
+    client.post(f'/admin/students/edit/{sid}', data=dict(FORM, exam='60', section='S2'), follow_redirects=True)
+    after_edit2 = checkpoint()
+    client.post(f'/admin/students/delete/{sid}', follow_redirects=True)
+
+    # A student added after the delete gets a fresh id
+    client.post('/predict', data=dict(FORM, name='AH_B'), follow_redirects=True)
+    second = Student.query.filter_by(name='AH_B', added_by='ah_t1').first()
+    assert second.id > sid, (second.id, sid)
+
+    audit_sink.flush()
+    db.session.rollback()  # start a fresh read snapshot
+
+    # Exactly the audit rows this test wrote for the student, in order
+    expected_ids = [a.id for a in Audit.query.filter(Audit.student_id == sid, Audit.id > audit_floor).order_by(Audit.id)]
+    history, truncated = student_history(sid)
+    assert not truncated
+    assert [h['id'] for h in history] == expected_ids, (history, expected_ids)
+    assert [h['action'] for h in history] == ['create', 'update', 'update', 'delete'], history
+    first_update = db.session.get(Audit, history[1]['id'])
+    changes = json.loads(first_update.changes)
+    assert set(changes) >= {'exam', 'final_grade'} and 'attendance' not in changes, changes
+    assert changes['exam'] == [80.0, 60.0]
+    assert history[2]['changes']['section'] == ['S1', 'S2']
+    logging.info('Update stored as %d bytes: %s', len(first_update.changes), first_update.changes)
+
+    # Replay the trail back to each point in time
+    assert student_state_at(sid, before_create) is None
+    assert student_state_at(sid, after_create)['exam'] == 80.0
+    state = student_state_at(sid, after_edit1)
+    assert state['exam'] == 60.0 and state['section'] == 'S1'
+    state = student_state_at(sid, after_edit2)
+    assert state['exam'] == 60.0 and state['section'] == 'S2' and state['name'] == 'AH_A'
+    assert student_state_at(sid, datetime.utcnow()) is None  # deleted
+
+    # Entries left by an earlier student that held the same id (pre-AUTOINCREMENT)
+    # are cut off at the newest create.
+    old = before_create - timedelta(days=1)
+    db.session.add_all([
+        Audit(action='create', user='ah_old', student_id=sid, timestamp=old),
+        Audit(action='update', user='ah_old', student_id=sid, timestamp=old + timedelta(hours=1),
+              changes=json.dumps({'exam': [10.0, 20.0]})),
+    ])
+    db.session.commit()
+    assert [h['id'] for h in student_history(sid)[0]] == expected_ids
+    assert student_state_at(sid, after_create)['exam'] == 80.0
+    assert student_state_at(sid, old + timedelta(hours=2)) is None
+
+    # Once the create rows are archived away the trail is reported as truncated
+    Audit.query.filter(Audit.student_id == sid, Audit.action == 'create').delete(synchronize_session=False)
+    db.session.commit()
+    history, truncated = student_history(sid)
+    assert truncated and history[0]['user'] == 'ah_old'
+
+    # The re-score job audits its changes, so replay still sees the pre-rescore grade
+    db.session.execute(update(Student).where(Student.id == second.id).values(final_grade=1.0))
+    db.session.commit()
+    before_rescore = checkpoint()
+    script = os.path.join(os.path.dirname(__file__), 'rescore_students.py')
+    subprocess.run([sys.executable, script, '--no-model', '--restart',
+                    '--checkpoint', os.path.join(tempfile.gettempdir(), 'ah_rescore.json')], check=True, capture_output=True)
+    db.session.expire_all()
+    rescored = db.session.get(Student, second.id)
+    assert rescored.final_grade != 1.0
+    entry = Audit.query.filter_by(student_id=second.id, user='system', action='update').one()
+    assert json.loads(entry.changes)['final_grade'] == [1.0, rescored.final_grade]
+    assert student_state_at(second.id, before_rescore)['final_grade'] == 1.0
+
+    # Cleanup
+    User.query.filter(User.username.in_(['ah_t1'])).delete(synchronize_session=False)
+    Student.query.filter(Student.added_by.in_(['ah_t1'])).delete(synchronize_session=False)
+    Audit.query.filter(Audit.user.in_(['ah_t1', 'ah_old'])).delete(synchronize_session=False)
+    Audit.query.filter(Audit.user == 'system', Audit.student_id == second.id).delete(synchronize_session=False)
+    db.session.commit()
+
+print('Audit history test OK')
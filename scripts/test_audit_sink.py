@@ -0,0 +1,39 @@
+import sys, os
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, User, Student, Audit, AuditSink, audit_sink
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['as_t1'])).delete(synchronize_session=False)
+    Audit.query.filter(Audit.user.in_(['as_t1', 'as_direct'])).delete(synchronize_session=False)
+    db.session.commit()
+
+    client = app.test_client()
+    client.post('/register', data={'username': 'as_t1', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    client.post('/', data={'username': 'as_t1', 'password': 'p'}, follow_redirects=True)
+    client.post('/predict', data={'name': 'AS_A', 'attendance': '90', 'activities': '80', 'quizzes': '80', 'performance_task': '80', 'exam': '80', 'section': 'S1', 'subject': 'math'}, follow_redirects=True)
+    s = Student.query.filter_by(name='AS_A', added_by='as_t1').first()
+    client.post(f'/admin/students/edit/{s.id}', data={'name': 'AS_A', 'attendance': '80', 'activities': '80', 'quizzes': '80', 'performance_task': '80', 'exam': '80', 'section': 'S1', 'subject': 'math'}, follow_redirects=True)
+    client.post(f'/admin/students/delete/{s.id}', follow_redirects=True)
+
+    # Queued records land in the audit table once the writer flushes
+    audit_sink.flush()
+    db.session.rollback()  # start a fresh read snapshot
+    logging.info('Audit sink stats: %s', audit_sink.stats())
+    actions = [a.action for a in Audit.query.filter_by(user='as_t1', student_id=s.id).order_by(Audit.timestamp)]
+    assert actions == ['create', 'update', 'delete'], f'Unexpected audit actions: {actions}'
+    deleted = Audit.query.filter_by(user='as_t1', action='delete').first()
+    assert deleted.details == 'Deleted student AS_A'
+
+    # A full queue drops records and counts them
+    tiny = AuditSink(batch_size=10, flush_interval=0.05, max_queue=1)
+    tiny._ensure_started = lambda: None  # keep records queued for the check
+    tiny.record('create', 'as_direct', 1, 'first')
+    tiny.record('create', 'as_direct', 2, 'second')
+    assert tiny.stats()['queue_depth'] == 1 and tiny.dropped == 1
+    tiny.flush()
+    assert tiny.written == 1 and Audit.query.filter_by(user='as_direct').count() == 1
+
+    logging.info('Audit sink tests passed')
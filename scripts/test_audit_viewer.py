@@ -0,0 +1,58 @@
+import sys, os
+import re
+import json
+import logging
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, User, Audit, explain_query_plan, filtered_audit_query
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['av_admin'])).delete(synchronize_session=False)
+    Audit.query.delete()
+    db.session.commit()
+    app.config['AUDIT_PAGE_SIZE'] = 10
+
+    # 25 rows for student 7 spread over 25 days, plus noise from another user
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    for i in range(25):
+        db.session.add(Audit(action='update', user='av_t1', student_id=7, timestamp=base + timedelta(days=i), details=f'change {i}'))
+    for i in range(5):
+        db.session.add(Audit(action='create', user='av_t2', student_id=100 + i, timestamp=base, details='other'))
+    db.session.commit()
+
+    client = app.test_client()
+    client.post('/register', data={'username': 'av_admin', 'password': 'p', 'role': 'Admin'}, follow_redirects=True)
+    client.post('/', data={'username': 'av_admin', 'password': 'p'}, follow_redirects=True)
+
+    # Page through one student's history, newest first
+    seen = []
+    text = client.get('/admin/audit?student_id=7').get_data(as_text=True)
+    while True:
+        seen += [int(x) for x in re.findall(r'change (\d+)', text)]
+        m = re.search(r'href="([^"]*cursor=[^"]*)">Older<', text)
+        if not m:
+            break
+        text = client.get(m.group(1).replace('&amp;', '&')).get_data(as_text=True)
+    logging.info('Seen %d audit rows', len(seen))
+    assert seen == list(range(24, -1, -1)), 'Keyset pages should walk the history newest first without gaps'
+
+    # Date range and user filters
+    text = client.get('/admin/audit?user=av_t1&date_from=2026-01-03&date_to=2026-01-04').get_data(as_text=True)
+    assert sorted(int(x) for x in re.findall(r'change (\d+)', text)) == [2, 3]
+
+    # Streamed exports
+    r = client.get('/admin/audit/export?format=csv&student_id=7')
+    lines = r.get_data(as_text=True).strip().splitlines()
+    assert lines[0] == 'id,timestamp,user,action,student_id,details,changes' and len(lines) == 26
+    r = client.get('/admin/audit/export?format=ndjson&user=av_t2')
+    records = [json.loads(line) for line in r.get_data(as_text=True).splitlines()]
+    assert len(records) == 5 and all(rec['user'] == 'av_t2' for rec in records)
+
+    # A student's history is an index lookup
+    plan = explain_query_plan(filtered_audit_query({'student_id': '7'}).order_by(Audit.timestamp.desc()).statement)
+    logging.info('Plan: %s', plan)
+    assert any('ix_audit_student_id_timestamp' in line for line in plan)
+
+    logging.info('Audit viewer tests passed')
@@ -0,0 +1,53 @@
+import sys, os
+import glob
+import logging
+import subprocess
+import tarfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, ConfirmToken, create_confirm_session, load_confirm_session, cleanup_confirm_sessions
+
+with app.app_context():
+    db.create_all()
+    ConfirmToken.query.delete()
+    db.session.commit()
+
+    payload = {'message': 'Delete?', 'action': '/x', 'hidden_items': {'_requires_confirm': '1'}, 'cancel_url': '/dashboard'}
+    token = create_confirm_session(payload)
+    assert load_confirm_session(token) == payload
+    assert load_confirm_session('missing') is None
+
+    client = app.test_client()
+    rv = client.get(f'/confirm/{token}')
+    assert rv.status_code == 200 and b'Delete?' in rv.data
+    rv = client.get('/confirm/missing')
+    assert rv.status_code == 302
+
+    # Expired tokens are invisible, and evicted a batch at a time on create
+    now = time.time()
+    db.session.add_all([ConfirmToken(token=f'old{i}', payload='{}', created=now - 1000, expires=now - 1000 + i) for i in range(120)])
+    db.session.commit()
+    assert load_confirm_session('old0') is None
+    create_confirm_session(payload)
+    batch = app.config['CONFIRM_EVICT_BATCH']
+    remaining = ConfirmToken.query.filter(ConfirmToken.token.like('old%')).count()
+    assert remaining == 120 - batch, remaining
+    assert db.session.get(ConfirmToken, 'old0') is None, 'Oldest expired tokens go first'
+    assert cleanup_confirm_sessions() == remaining
+    assert ConfirmToken.query.count() == 2
+
+    # The archive script exports live tokens and removes them
+    before = set(glob.glob(os.path.join(app.instance_path, 'backups', 'confirm-archive-*.tar.gz')))
+    subprocess.run([sys.executable, os.path.join(os.path.dirname(__file__), 'archive_confirm_tokens.py')], check=True)
+    archives = set(glob.glob(os.path.join(app.instance_path, 'backups', 'confirm-archive-*.tar.gz'))) - before
+    assert len(archives) == 1
+    archive = archives.pop()
+    with tarfile.open(archive) as tar:
+        names = tar.getnames()
+    os.remove(archive)
+    assert token + '.json' in names, names
+    db.session.expire_all()
+    assert ConfirmToken.query.count() == 0
+    logging.info('Archived %d token(s)', len(names))
+
+print('Confirm token test OK')
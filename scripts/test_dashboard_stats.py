@@ -0,0 +1,67 @@
+import sys, os
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, User, Student, StudentStats, get_student_counts, rebuild_student_stats, init_db
+from sqlalchemy import text
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['ds_t1', 'ds_t2', 'ds_admin'])).delete(synchronize_session=False)
+    Student.query.delete()
+    db.session.commit()
+    rebuild_student_stats()
+
+    client = app.test_client()
+
+    # t1 adds one High Risk and one Low Risk student
+    client.post('/register', data={'username': 'ds_t1', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    client.post('/', data={'username': 'ds_t1', 'password': 'p'}, follow_redirects=True)
+    client.post('/predict', data={'name': 'DS_High', 'attendance': '90', 'activities': '50', 'quizzes': '50', 'performance_task': '60', 'exam': '65', 'section': 'S1', 'subject': 'math'}, follow_redirects=True)
+    client.post('/predict', data={'name': 'DS_Low', 'attendance': '90', 'activities': '90', 'quizzes': '90', 'performance_task': '90', 'exam': '90', 'section': 'S1', 'subject': 'math'}, follow_redirects=True)
+    client.get('/logout')
+
+    # t2 adds one High Risk student in another section
+    client.post('/register', data={'username': 'ds_t2', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    client.post('/', data={'username': 'ds_t2', 'password': 'p'}, follow_redirects=True)
+    client.post('/predict', data={'name': 'DS_Other', 'attendance': '90', 'activities': '50', 'quizzes': '50', 'performance_task': '50', 'exam': '50', 'section': 'S2', 'subject': 'science'}, follow_redirects=True)
+    client.get('/logout')
+
+    logging.info('t1 counts: %s', get_student_counts('ds_t1'))
+    logging.info('all counts: %s', get_student_counts())
+    assert get_student_counts('ds_t1') == (2, 1), 'Expected t1 to have 2 students, 1 at risk'
+    assert get_student_counts() == (3, 2), 'Expected 3 students, 2 at risk overall'
+
+    # Editing the low-risk student down to High Risk and moving section updates both groups
+    client.post('/', data={'username': 'ds_t1', 'password': 'p'}, follow_redirects=True)
+    low = Student.query.filter_by(name='DS_Low').first()
+    client.post(f'/admin/students/edit/{low.id}', data={'name': 'DS_Low', 'attendance': '90', 'activities': '40', 'quizzes': '40', 'performance_task': '40', 'exam': '40', 'section': 'S3', 'subject': 'math'}, follow_redirects=True)
+    assert get_student_counts('ds_t1') == (2, 2), 'Expected both t1 students at risk after edit'
+    assert db.session.get(StudentStats, ('ds_t1', 'S3')).total == 1
+
+    # Delete one student and bulk delete a section
+    client.post(f'/admin/students/delete/{low.id}', follow_redirects=True)
+    assert get_student_counts('ds_t1') == (1, 1)
+    client.post('/sections/delete', data={'section': 'S1'}, follow_redirects=True)
+    assert get_student_counts('ds_t1') == (0, 0)
+
+    # Dashboard renders counts from the summary table; a full rebuild agrees
+    r = client.get('/dashboard')
+    assert r.status_code == 200
+    before = get_student_counts()
+    rebuild_student_stats()
+    assert get_student_counts() == before == (1, 1), 'Rebuilt stats should match maintained stats'
+
+    # An existing database without summary rows is filled by migration 8, so a
+    # write before any rebuild still leaves correct totals
+    init_db()
+    StudentStats.query.delete()
+    db.session.execute(text('DELETE FROM schema_migrations WHERE version = 8'))
+    db.session.commit()
+    assert init_db() == [8]
+    assert get_student_counts() == (1, 1)
+    client.post('/', data={'username': 'ds_t2', 'password': 'p'}, follow_redirects=True)
+    client.post('/predict', data={'name': 'DS_New', 'attendance': '90', 'activities': '90', 'quizzes': '90', 'performance_task': '90', 'exam': '90', 'section': 'S2', 'subject': 'math'}, follow_redirects=True)
+    assert get_student_counts('ds_t2') == (2, 1) and get_student_counts() == (2, 1)
+
+    logging.info('Dashboard stats tests passed')
@@ -0,0 +1,63 @@
+import sys, os
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import (app, db, User, Student, TTLCache, facet_cache, rebuild_student_stats,
+                 refresh_student_stats, student_facet_values, commit_with_retry)
+
+# TTL expiry and size-bounded eviction
+cache = TTLCache(maxsize=2, ttl=60)
+cache.set('a', 1)
+cache.set('b', 2)
+cache.get('a')
+cache.set('c', 3)
+assert cache.get('b') is None and cache.get('a') == 1, 'Least recently used entry should be evicted'
+assert cache.evictions == 1
+expired = TTLCache(maxsize=2, ttl=-1)
+expired.set('a', 1)
+assert expired.get('a') is None
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['fc_t1'])).delete(synchronize_session=False)
+    Student.query.delete()
+    db.session.commit()
+    rebuild_student_stats()
+
+    client = app.test_client()
+    client.post('/register', data={'username': 'fc_t1', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    client.post('/', data={'username': 'fc_t1', 'password': 'p'}, follow_redirects=True)
+    client.post('/predict', data={'name': 'FC1', 'attendance': '90', 'activities': '80', 'quizzes': '80', 'performance_task': '80', 'exam': '80', 'section': 'Alpha', 'subject': 'math'}, follow_redirects=True)
+
+    client.get('/admin/students')
+    hits_before = facet_cache.hits
+    client.get('/admin/students')
+    client.get('/sections')
+    logging.info('Facet cache stats: %s', facet_cache.stats())
+    assert facet_cache.hits >= hits_before + 3, 'Repeated page loads should be served from the facet cache'
+
+    # A write invalidates the owner's facets so the new section shows up
+    client.post('/predict', data={'name': 'FC2', 'attendance': '90', 'activities': '80', 'quizzes': '80', 'performance_task': '80', 'exam': '80', 'section': 'Beta', 'subject': 'science'}, follow_redirects=True)
+    text = client.get('/admin/students').get_data(as_text=True)
+    assert '<option value="Beta"' in text and '<option value="science"' in text, 'Facets should refresh after a write'
+
+    # Invalidation waits for the commit: a read between flush and commit must not
+    # leave the uncommitted section cached, and a rollback drops it as well.
+    def add_pending(name, section):
+        db.session.add(Student(name=name, added_by='fc_t1', section=section, subject='math'))
+        refresh_student_stats([('fc_t1', section)])  # flushes
+
+    student_facet_values(Student.section, 'Teacher', 'fc_t1')
+    add_pending('FC3', 'Gamma')
+    assert 'Gamma' not in facet_cache.get(('fc_t1', 'section')), 'Cache must not be cleared before commit'
+    facet_cache.pop(('fc_t1', 'section'))
+    assert 'Gamma' in student_facet_values(Student.section, 'Teacher', 'fc_t1')  # cached from the open transaction
+    db.session.rollback()
+    assert 'Gamma' not in student_facet_values(Student.section, 'Teacher', 'fc_t1'), 'Rollback should drop values cached mid-transaction'
+
+    add_pending('FC4', 'Delta')
+    assert 'Delta' not in student_facet_values(Student.section, 'Teacher', 'fc_t1')
+    commit_with_retry()
+    assert 'Delta' in student_facet_values(Student.section, 'Teacher', 'fc_t1'), 'Commit should invalidate the owner facets'
+
+    logging.info('Facet cache tests passed')
@@ -0,0 +1,68 @@
+import sys, os
+import csv
+import logging
+import sqlite3
+import subprocess
+import tempfile
+
+script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generate_dataset.py')
+
+
+def run(db_path, *extra):
+    subprocess.run([sys.executable, script, '--database', db_path, '--students', '3000', '--teachers', '4',
+                    '--sections', '5', '--section-skew', '1.5', '--audits-per-student', '2', '--chunk-size', '700',
+                    *extra], check=True)
+
+
+def dump(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        students = conn.execute('SELECT name, section, subject, attendance, exam, final_grade, risk, added_by FROM student ORDER BY id').fetchall()
+        audits = conn.execute("SELECT action, user, student_id, changes FROM audit ORDER BY id").fetchall()
+        stats = conn.execute('SELECT SUM(total) FROM student_stats').fetchone()[0]
+        indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name IN ('student', 'audit')")}
+    finally:
+        conn.close()
+    return students, audits, stats, indexes
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    first, second = os.path.join(tmp, 'a.db'), os.path.join(tmp, 'b.db')
+    csv_path = os.path.join(tmp, 'import.csv')
+    run(first, '--csv', csv_path, '--csv-rows', '50')
+    run(second)
+
+    students, audits, stats, indexes = dump(first)
+    assert len(students) == 3000 and stats == 3000
+    assert (students, audits) == dump(second)[:2], 'Same seed and options should give the same data'
+    assert sum(1 for a in audits if a[0] == 'create') == 3000 and len(audits) == 6000
+    assert {'ix_student_added_by_id', 'ix_audit_timestamp_id'} <= indexes, 'Indexes should be rebuilt after loading'
+
+    # Zipf-skewed sections: Section 1 is the largest
+    counts = {}
+    for s in students:
+        counts[s[1]] = counts.get(s[1], 0) + 1
+    assert max(counts, key=counts.get) == 'Section 1', counts
+    assert all(0 <= s[3] <= 100 and 0 <= s[4] <= 100 for s in students)
+    logging.info('Section sizes: %s', counts)
+
+    with open(csv_path, newline='', encoding='utf-8') as fh:
+        rows = list(csv.DictReader(fh))
+    assert len(rows) == 50 and rows[0]['name'] == 'Import Student 0' and rows[0]['section'].startswith('Section ')
+
+    # Ids of deleted students are not handed out again, even with their audits gone
+    conn = sqlite3.connect(second)
+    conn.execute('DELETE FROM audit WHERE student_id > 2900')
+    conn.execute('DELETE FROM student WHERE id > 2900')
+    conn.commit()
+    conn.close()
+    run(second, '--students', '10', '--prefix', 'more', '--audits-per-student', '1')
+    conn = sqlite3.connect(second)
+    new_ids = [r[0] for r in conn.execute("SELECT id FROM student WHERE added_by LIKE 'more_%' ORDER BY id")]
+    conn.close()
+    assert new_ids == list(range(3001, 3011)), new_ids
+
+    run(first, '--reset', '--seed', '7')
+    assert len(dump(first)[0]) == 3000 and dump(first)[0] != students
+
+print('Dataset generator test OK')
@@ -0,0 +1,92 @@
+import sys, os
+import io
+import re
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import app as app_module
+from app import app, db, User, Student, Audit, get_student_counts, rebuild_student_stats, load_import_meta
+from sqlalchemy import event
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['bulk_t1'])).delete(synchronize_session=False)
+    Student.query.delete()
+    Audit.query.filter(Audit.user == 'bulk_t1').delete(synchronize_session=False)
+    db.session.commit()
+    rebuild_student_stats()
+
+    # Small chunks so the import spans several transactions; preview only a few rows
+    app.config['IMPORT_CHUNK_SIZE'] = 7
+    app.config['IMPORT_PREVIEW_ROWS'] = 5
+
+    client = app.test_client()
+    client.post('/register', data={'username': 'bulk_t1', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    client.post('/', data={'username': 'bulk_t1', 'password': 'p'}, follow_redirects=True)
+
+    csv_text = 'name,section,subject,activities,quizzes,performance_task,exam,attendance,notes\n'
+    for i in range(50):
+        grade = 60 if i % 5 == 0 else 90
+        csv_text += f'Bulk{i},Sec{i % 3},math,{grade},{grade},{grade},{grade},95,\n'
+    csv_text += ',Sec1,math,1,1,1,1,1,missing name\n'
+    r = client.post('/import_csv', data={'file': (io.BytesIO(csv_text.encode('utf-8')), 'students.csv')}, content_type='multipart/form-data')
+    preview = r.get_data(as_text=True)
+    m = re.search(r'/import_csv/save/([0-9a-f-]+)', preview)
+    assert m, 'Preview should link to the save route'
+    assert 'Valid rows: 50 | Invalid rows: 1' in preview, 'Preview should report totals for the whole upload'
+    assert 'Bulk4' in preview and 'Bulk5' not in preview, 'Preview should only render the first rows'
+
+    r = client.get(f'/import_csv/download/{m.group(1)}')
+    assert r.get_data(as_text=True).count('\n') == 51, 'Download should contain every valid row'
+
+    # One executemany per chunk for the student rows (8 chunks of up to 7 rows)
+    student_inserts = []
+    def count_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO student '):
+            student_inserts.append(executemany)
+    event.listen(db.engine, 'before_cursor_execute', count_inserts)
+    try:
+        r = client.post(f'/import_csv/save/{m.group(1)}', follow_redirects=True)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_inserts)
+    assert len(student_inserts) == 8, student_inserts
+    text = r.get_data(as_text=True)
+    logging.info('Save response contains count: %s', 'Saved 50 student(s)' in text)
+    assert 'Saved 50 student(s)' in text
+
+    assert Student.query.filter_by(added_by='bulk_t1').count() == 50
+    audits = Audit.query.filter_by(user='bulk_t1', action='create').all()
+    assert len(audits) == 50, 'Expected one audit row per imported student'
+    ids = {s.id for s in Student.query.filter_by(added_by='bulk_t1')}
+    assert {a.student_id for a in audits} == ids, 'Audit rows should reference the inserted students'
+    names = {s.id: s.name for s in Student.query.filter_by(added_by='bulk_t1')}
+    assert all(a.details == f'Imported student {names[a.student_id]} via CSV' for a in audits), 'Audit rows should match their student'
+    assert get_student_counts('bulk_t1') == (50, 10)
+
+    # After a partial failure, saving again only retries the chunks that failed
+    Student.query.filter_by(added_by='bulk_t1').delete(synchronize_session=False)
+    db.session.commit()
+    rebuild_student_stats()
+    r = client.post('/import_csv', data={'file': (io.BytesIO(csv_text.encode('utf-8')), 'students.csv')}, content_type='multipart/form-data')
+    token = re.search(r'/import_csv/save/([0-9a-f-]+)', r.get_data(as_text=True)).group(1)
+    real_commit, calls = app_module.commit_with_retry, [0]
+    def flaky_commit():
+        calls[0] += 1
+        if calls[0] in (2, 5):
+            raise RuntimeError('simulated failure')
+        real_commit()
+    app_module.commit_with_retry = flaky_commit
+    try:
+        text = client.post(f'/import_csv/save/{token}', follow_redirects=True).get_data(as_text=True)
+    finally:
+        app_module.commit_with_retry = real_commit
+    assert 'Saved 36 student(s)' in text and 'Rows 8-14 could not be saved' in text and 'Rows 29-35' in text
+    assert load_import_meta(token)['committed_chunks'] == [0, 14, 21, 35, 42, 49]
+    text = client.post(f'/import_csv/save/{token}', follow_redirects=True).get_data(as_text=True)
+    assert 'Saved 14 student(s)' in text
+    assert Student.query.filter_by(added_by='bulk_t1').count() == 50
+    assert sorted(s.name for s in Student.query.filter_by(added_by='bulk_t1')) == sorted(f'Bulk{i}' for i in range(50))
+    assert load_import_meta(token) is None
+    assert get_student_counts('bulk_t1') == (50, 10)
+
+    logging.info('Bulk import tests passed')
@@ -0,0 +1,74 @@
+import sys, os
+import io
+import re
+import time
+import logging
+import uuid
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import (app, db, User, spool_import, read_import_rows, iter_import_results, load_import_meta,
+                 discard_import, cleanup_import_sessions, import_session_dir)
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['is_t1'])).delete(synchronize_session=False)
+    db.session.commit()
+
+    # Rows are stored in compressed chunks and any range can be read back
+    rows = [('result', {'name': f'R{i}', 'n': i}) for i in range(2500)] + [('error', {'row': i, 'errors': ['x']}) for i in range(3)]
+    store = str(uuid.uuid4())
+    meta = spool_import(store, iter(rows), chunk_rows=1000)
+    assert meta['valid'] == 2500 and meta['invalid'] == 3
+    assert [len(meta['index']['result']), len(meta['index']['error'])] == [3, 1]
+    page = read_import_rows(store, 995, 1010)
+    assert [r['n'] for r in page] == list(range(995, 1010)), 'Ranges spanning chunks should be contiguous'
+    assert [r['n'] for r in read_import_rows(store, 2490, 3000)] == list(range(2490, 2500))
+    assert sum(1 for _ in iter_import_results(store)) == 2500
+    assert len(read_import_rows(store, 0, 10, kind='error')) == 3
+    size = sum(os.path.getsize(os.path.join(import_session_dir(store), f)) for f in os.listdir(import_session_dir(store)))
+    logging.info('2500 rows stored in %d bytes', size)
+
+    # Sessions past their TTL are unreadable and removed by cleanup
+    old = time.time() - app.config['IMPORT_SESSION_TTL'] - 10
+    os.utime(import_session_dir(store), (old, old))
+    assert cleanup_import_sessions() >= 1
+    assert load_import_meta(store) is None
+    discard_import(store)
+
+    # Preview pages read later rows from the store
+    app.config['IMPORT_PREVIEW_ROWS'] = 10
+    client = app.test_client()
+    client.post('/register', data={'username': 'is_t1', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    client.post('/', data={'username': 'is_t1', 'password': 'p'}, follow_redirects=True)
+    csv_text = 'name,section,subject,activities,quizzes,performance_task,exam,attendance,notes\n'
+    csv_text += ''.join(f'Store{i},S1,math,80,80,80,80,90,\n' for i in range(35))
+    r = client.post('/import_csv', data={'file': (io.BytesIO(csv_text.encode('utf-8')), 'students.csv')}, content_type='multipart/form-data')
+    token = re.search(r'/import_csv/save/([0-9a-f-]+)', r.get_data(as_text=True)).group(1)
+    text = client.get(f'/import_csv/preview/{token}?start=20').get_data(as_text=True)
+    assert 'Store20' in text and 'Store29' in text and 'Store30' not in text and 'Store19<' not in text
+    assert 'Showing rows 21-30 of 35' in text
+
+    r = client.get(f'/import_csv/download/{token}')
+    assert r.is_streamed
+    lines = r.get_data(as_text=True).splitlines()
+    assert len(lines) == 36 and lines[1].startswith('Store0,')
+
+    # Saving consumes the import session
+    client.post(f'/import_csv/save/{token}', follow_redirects=True)
+    assert load_import_meta(token) is None
+
+    # Tokens that are not uuid4 strings never reach the filesystem
+    for bad in ('..', '.', 'x' * 36, token.upper(), token + '%0A'):
+        assert client.get(f'/import_csv/preview/{bad}').status_code == 404, bad
+        assert client.post(f'/import_csv/save/{bad}').status_code == 404, bad
+        assert client.get(f'/import_csv/download/{bad}').status_code == 404, bad
+    assert os.path.isdir(app.instance_path)
+
+    # Cleanup
+    from app import Student, Audit
+    Student.query.filter_by(added_by='is_t1').delete(synchronize_session=False)
+    Audit.query.filter_by(user='is_t1').delete(synchronize_session=False)
+    User.query.filter(User.username.in_(['is_t1'])).delete(synchronize_session=False)
+    db.session.commit()
+
+print('Import store test OK')
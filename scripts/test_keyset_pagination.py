@@ -0,0 +1,56 @@
+import sys, os
+import re
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, User, Student, rebuild_student_stats
+
+
+def ids_on_page(text):
+    return [int(x) for x in re.findall(r'<tr>\s*<td>(\d+)</td>', text)]
+
+
+def cursor_link(text, label):
+    m = re.search(r'href="([^"]*cursor=[^"]*)">' + label + '<', text)
+    return m.group(1).replace('&amp;', '&') if m else None
+
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['kp_t1'])).delete(synchronize_session=False)
+    Student.query.delete()
+    db.session.commit()
+    rebuild_student_stats()
+
+    client = app.test_client()
+    client.post('/register', data={'username': 'kp_t1', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    client.post('/', data={'username': 'kp_t1', 'password': 'p'}, follow_redirects=True)
+    for i in range(25):
+        client.post('/predict', data={'name': f'KP{i}', 'attendance': '90', 'activities': '80', 'quizzes': '80', 'performance_task': '80', 'exam': '80', 'section': 'S1', 'subject': 'math' if i % 2 else 'science'}, follow_redirects=True)
+    expected = [s.id for s in Student.query.filter_by(added_by='kp_t1').order_by(Student.id)]
+
+    # Walk forward with Next cursors
+    r = client.get('/admin/students')
+    text = r.get_data(as_text=True)
+    assert 'of 25' in text, 'Total should come from the stats table'
+    pages = [ids_on_page(text)]
+    while cursor_link(text, 'Next'):
+        text = client.get(cursor_link(text, 'Next')).get_data(as_text=True)
+        pages.append(ids_on_page(text))
+    logging.info('Page sizes: %s', [len(p) for p in pages])
+    assert [i for p in pages for i in p] == expected, 'Keyset pages should cover every student once, in id order'
+    assert [len(p) for p in pages] == [10, 10, 5]
+
+    # Walk back from the last page with Previous cursors
+    text = client.get(cursor_link(text, 'Previous')).get_data(as_text=True)
+    assert ids_on_page(text) == pages[1]
+    text = client.get(cursor_link(text, 'Previous')).get_data(as_text=True)
+    assert ids_on_page(text) == pages[0] and not cursor_link(text, 'Previous')
+
+    # Filtered counts and tampered cursors
+    text = client.get('/admin/students?subject=math').get_data(as_text=True)
+    assert 'of 12' in text
+    r = client.get('/admin/students?cursor=not-a-real-cursor')
+    assert ids_on_page(r.get_data(as_text=True)) == pages[0], 'An invalid cursor should fall back to the first page'
+
+    logging.info('Keyset pagination tests passed')
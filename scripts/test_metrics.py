@@ -0,0 +1,57 @@
+import sys, os
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, User, request_metrics
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['mx_admin', 'mx_t1'])).delete(synchronize_session=False)
+    db.session.commit()
+    request_metrics.reset()
+
+    admin = app.test_client()
+    admin.post('/register', data={'username': 'mx_admin', 'password': 'p', 'role': 'Admin'}, follow_redirects=True)
+    admin.post('/', data={'username': 'mx_admin', 'password': 'p'}, follow_redirects=True)
+    teacher = app.test_client()
+    teacher.post('/register', data={'username': 'mx_t1', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    teacher.post('/', data={'username': 'mx_t1', 'password': 'p'}, follow_redirects=True)
+    request_metrics.reset()
+    for _ in range(5):
+        admin.get('/dashboard')
+        admin.get('/admin/students')
+
+    stats = {e['endpoint']: e for e in request_metrics.snapshot()}
+    assert stats['dashboard']['requests'] == 5
+    assert stats['manage_students']['sql_per_request'] >= 2, 'SQL statements should be counted per request'
+    assert stats['manage_students']['template_ms_per_request'] > 0, 'Template render time should be recorded'
+    assert stats['dashboard']['db_ms_per_request'] > 0
+    logging.info('manage_students: %s', stats['manage_students'])
+
+    # Admin page and Prometheus text; teachers are refused
+    r = admin.get('/admin/metrics')
+    assert r.status_code == 200 and b'manage_students' in r.data
+    assert teacher.get('/admin/metrics').status_code == 302
+    assert teacher.get('/metrics').status_code == 403
+    text = admin.get('/metrics').get_data(as_text=True)
+    assert 'edupredict_request_duration_seconds_bucket{endpoint="dashboard",le="+Inf"} 5' in text
+    assert 'edupredict_sql_statements_total{endpoint="manage_students"}' in text
+    assert 'edupredict_audit_records_total{outcome="written"}' in text
+
+    # Scrapers can use the bearer token instead of a session
+    app.config['METRICS_TOKEN'] = 'scrape-me'
+    try:
+        anon = app.test_client()
+        assert anon.get('/metrics').status_code == 403
+        assert anon.get('/metrics', headers={'Authorization': 'Bearer scrape-me'}).status_code == 200
+    finally:
+        app.config['METRICS_TOKEN'] = None
+
+    admin.post('/admin/metrics/reset')
+    assert 'dashboard' not in {e['endpoint'] for e in request_metrics.snapshot()}
+
+    # Cleanup
+    User.query.filter(User.username.in_(['mx_admin', 'mx_t1'])).delete(synchronize_session=False)
+    db.session.commit()
+
+print('Metrics test OK')
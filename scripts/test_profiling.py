@@ -0,0 +1,57 @@
+import sys, os
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, User, list_profiles, profile_dir
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['pf_admin', 'pf_t1'])).delete(synchronize_session=False)
+    db.session.commit()
+    before = {p[0] for p in list_profiles()}
+
+    admin = app.test_client()
+    admin.post('/register', data={'username': 'pf_admin', 'password': 'p', 'role': 'Admin'}, follow_redirects=True)
+    admin.post('/', data={'username': 'pf_admin', 'password': 'p'}, follow_redirects=True)
+    teacher = app.test_client()
+    teacher.post('/register', data={'username': 'pf_t1', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    teacher.post('/', data={'username': 'pf_t1', 'password': 'p'}, follow_redirects=True)
+
+    # Single-request profiling is for Admins only
+    r = teacher.get('/dashboard?_profile=1')
+    assert 'X-Profile-File' not in r.headers
+    r = admin.get('/dashboard', headers={'X-Profile': '1'})
+    name = r.headers.get('X-Profile-File')
+    assert name and name.endswith('-dashboard.pstats')
+    assert os.path.exists(os.path.join(profile_dir(), name))
+
+    r = admin.get(f'/admin/profiling?profile={name}')
+    assert r.status_code == 200 and b'function calls' in r.data
+    assert admin.get(f'/admin/profiling/download/{name}').status_code == 200
+    # Unknown sort keys fall back to the default instead of erroring
+    for sort in ('tottime', 'ncalls', 'bogus', '__class__'):
+        rv = admin.get(f'/admin/profiling?profile={name}&sort={sort}')
+        assert rv.status_code == 200 and 'function calls' in rv.get_data(as_text=True), sort
+    assert teacher.get('/admin/profiling').status_code == 302
+
+    # Sampled profiling of one endpoint applies to every user
+    admin.post('/admin/profiling', data={'endpoints': ['sections'], 'sample_rate': '1'})
+    try:
+        assert 'X-Profile-File' in teacher.get('/sections').headers
+        assert 'X-Profile-File' not in teacher.get('/dashboard').headers
+    finally:
+        admin.post('/admin/profiling', data={'sample_rate': '0'})
+    assert not app.config['PROFILE_ENDPOINTS']
+    assert 'X-Profile-File' not in teacher.get('/sections').headers
+
+    created = {p[0] for p in list_profiles()} - before
+    logging.info('Profiles written: %s', sorted(created))
+    assert len(created) == 2
+    for n in created:
+        os.remove(os.path.join(profile_dir(), n))
+
+    # Cleanup
+    User.query.filter(User.username.in_(['pf_admin', 'pf_t1'])).delete(synchronize_session=False)
+    db.session.commit()
+
+print('Profiling test OK')
@@ -0,0 +1,33 @@
+import sys, os
+import shutil
+import tempfile
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, RiskModelCache
+
+with app.app_context():
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, 'risk_model.pkl')
+    shutil.copy2(app.config['RISK_MODEL_PATH'], path)
+    cache = RiskModelCache(path)
+
+    # Loaded once and kept warm across calls
+    first = cache.predict_proba([90, 50], [88, 60])
+    cache.predict_proba([70], [75])
+    logging.info('Model metrics: %s', cache.metrics())
+    assert first is not None and len(first) == 2
+    assert first[0] < first[1], 'Low attendance/grade should have a higher dropout probability'
+    assert cache.loads == 1 and cache.batches == 2 and cache.rows == 3
+
+    # Touching the pickle triggers a reload on next use
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 10))
+    cache.predict_proba([90], [88])
+    assert cache.loads == 2, 'Expected a reload after the model file changed'
+
+    # A missing model degrades to None instead of raising
+    missing = RiskModelCache(os.path.join(tmpdir, 'missing.pkl'))
+    assert missing.predict_proba([90], [88]) is None
+
+    shutil.rmtree(tmpdir)
+    logging.info('Risk model cache tests passed')
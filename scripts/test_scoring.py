@@ -0,0 +1,30 @@
+import sys, os
+import random
+import time
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import score_student, score_batch
+
+# Known values around the 76 threshold
+assert score_student(90, 90, 90, 90) == (90.0, 90.0, 'Low Risk')
+assert score_student(0, 0, 80, 80) == (0, 64.0, 'High Risk')
+assert score_student(76, 76, 76, 76)[2] == 'Low Risk'
+assert score_student(75, 75, 76, 76)[2] == 'High Risk'
+
+# Batch scoring must agree with the scalar path, including half-cent ties
+rng = random.Random(42)
+n = 100000
+cols = [[round(rng.uniform(0, 100), rng.choice([0, 1, 2, 3])) for _ in range(n)] for _ in range(4)]
+cols[0][:4] = [80.125, 0, 100, 75.005]
+cols[1][:4] = [80.125, 0, 100, 75.005]
+
+start = time.perf_counter()
+ww, fg, risk = score_batch(*cols)
+elapsed = time.perf_counter() - start
+logging.info('Scored %d rows in %.1f ms', n, elapsed * 1000)
+
+for i, row in enumerate(zip(*cols)):
+    expected = score_student(*row)
+    assert (ww[i], fg[i], risk[i]) == expected, f'Row {i} mismatch: {(ww[i], fg[i], risk[i])} != {expected}'
+
+logging.info('Scoring tests passed')
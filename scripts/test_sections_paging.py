@@ -0,0 +1,49 @@
+import sys, os
+import re
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, User, Student, bulk_insert_students, rebuild_student_stats, section_summary_query
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['sp_t1'])).delete(synchronize_session=False)
+    Student.query.delete()
+    db.session.commit()
+    rebuild_student_stats()
+    app.config['SECTION_PAGE_SIZE'] = 25
+
+    rows = [{'name': f'SPA{i}', 'section': 'SA', 'subject': 'math', 'final_grade': 80, 'risk': 'Low Risk'} for i in range(30)]
+    rows += [{'name': f'SPB{i}', 'section': 'SB', 'subject': 'math', 'final_grade': 60, 'risk': 'High Risk'} for i in range(2)]
+    bulk_insert_students(rows, 'sp_t1')
+
+    client = app.test_client()
+    client.post('/register', data={'username': 'sp_t1', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    client.post('/', data={'username': 'sp_t1', 'password': 'p'}, follow_redirects=True)
+
+    # First section expanded by default; the other only shows its header and counts
+    text = client.get('/sections').get_data(as_text=True)
+    assert 'SA <span class="badge bg-secondary ms-2">30</span>' in text
+    assert 'SB <span class="badge bg-secondary ms-2">2</span>' in text
+    assert 'Delete my 2 in this section' in text
+    assert len(re.findall(r'>SPA\d+<', text)) == 25, 'Expanded section should render one page of rows'
+    assert 'SPB0' not in text, 'Collapsed sections should not load student rows'
+
+    m = re.search(r'href="([^"]*cursor=[^"]*)">Next<', text)
+    text = client.get(m.group(1).replace('&amp;', '&')).get_data(as_text=True)
+    assert len(re.findall(r'>SPA\d+<', text)) == 5
+
+    # Expanding another section and filtering by risk
+    text = client.get('/sections?section=SB').get_data(as_text=True)
+    assert 'SPB0' in text and 'SPA0' not in text
+    text = client.get('/sections?risk=High+Risk').get_data(as_text=True)
+    assert 'SA <span' not in text and 'SPB1' in text
+
+    # Unfiltered headers come from student_stats and agree with the student aggregate
+    from_stats = section_summary_query('Admin', 'sp_t1').all()
+    assert 'student_stats' in str(section_summary_query('Admin', 'sp_t1').statement)
+    assert from_stats == section_summary_query('Admin', 'sp_t1', subject='math').all() == [('SA', 30, 30), ('SB', 2, 2)]
+    assert section_summary_query('Teacher', 'sp_t1', risk='High Risk').all() == [('SB', 2, 2)]
+    assert section_summary_query('Admin', 'nobody').all() == [('SA', 30, 0), ('SB', 2, 0)]
+
+    logging.info('Sections paging tests passed')
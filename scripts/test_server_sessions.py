@@ -0,0 +1,95 @@
+import sys, os
+import logging
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, User, ServerSessionRecord, MemorySessionBackend, ServerSideSessionInterface, TaggedJSONSerializer
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['ss_t1', 'ss_a1'])).delete(synchronize_session=False)
+    db.session.commit()
+
+    client = app.test_client()
+    client.post('/register', data={'username': 'ss_t1', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    rv = client.post('/', data={'username': 'ss_t1', 'password': 'p'})
+    cookie = client.get_cookie('session')
+    assert cookie is not None and len(cookie.value) < 64, 'Cookie should only carry a short session ID'
+    row = db.session.get(ServerSessionRecord, cookie.value)
+    assert row is not None and 'ss_t1' in row.data
+    logging.info('Session cookie is %d bytes', len(cookie.value))
+
+    # An established session is not re-sent and not rewritten when nothing changes
+    client.get('/dashboard')
+    saved = [0]
+    backend = app.session_interface.backend
+    original_save = backend.save
+    def counting_save(*args):
+        saved[0] += 1
+        original_save(*args)
+    backend.save = counting_save
+    try:
+        rv = client.get('/dashboard')
+        assert rv.status_code == 200
+        assert 'Set-Cookie' not in rv.headers, rv.headers.get('Set-Cookie')
+        assert saved[0] == 0, 'Unchanged session should not be written back'
+        client.get('/admin/students')  # new nav_history entry
+        assert saved[0] == 1
+    finally:
+        backend.save = original_save
+
+    # Logout clears the stored session and the cookie
+    client.get('/logout')
+    db.session.expire_all()
+    assert db.session.get(ServerSessionRecord, cookie.value) is None
+    assert client.get_cookie('session') is None
+
+    # Expired rows are swept
+    db.session.add(ServerSessionRecord(id='ss-expired', data='{}', expires=time.time() - 1))
+    db.session.commit()
+    assert backend.sweep() >= 1
+    assert db.session.get(ServerSessionRecord, 'ss-expired') is None
+
+    # The in-process LRU backend works the same way
+    sqlite_interface = app.session_interface
+    app.session_interface = ServerSideSessionInterface(MemorySessionBackend(100, 3600), 3600)
+    try:
+        client = app.test_client()
+        client.post('/', data={'username': 'ss_t1', 'password': 'p'})
+        sid = client.get_cookie('session').value
+        assert app.session_interface.backend.load(sid) is not None
+        assert client.get('/dashboard').status_code == 200
+        assert db.session.get(ServerSessionRecord, sid) is None
+    finally:
+        app.session_interface = sqlite_interface
+
+    # Logging in moves the session to a new ID (no session fixation)
+    client = app.test_client()
+    planted = 'ss-planted-sid'
+    app.session_interface.backend.save(planted, TaggedJSONSerializer().dumps({'csrf': 'x'}), time.time() + 3600)
+    client.set_cookie('session', planted)
+    client.post('/', data={'username': 'ss_t1', 'password': 'p'})
+    sid = client.get_cookie('session').value
+    assert sid != planted, 'Login must issue a fresh session ID'
+    db.session.expire_all()
+    assert db.session.get(ServerSessionRecord, planted) is None
+    assert client.get('/dashboard').status_code == 200
+
+    # So does a change to the signed-in user's own role
+    client = app.test_client()
+    client.post('/register', data={'username': 'ss_a1', 'password': 'p', 'role': 'Admin'}, follow_redirects=True)
+    client.post('/', data={'username': 'ss_a1', 'password': 'p'})
+    before = client.get_cookie('session').value
+    admin = User.query.filter_by(username='ss_a1').first()
+    client.post(f'/admin/users/role/{admin.id}', data={'role': 'Teacher'})
+    after = client.get_cookie('session').value
+    assert after != before
+    db.session.expire_all()
+    assert db.session.get(ServerSessionRecord, before) is None
+    assert 'Teacher' in db.session.get(ServerSessionRecord, after).data
+
+    # Cleanup
+    User.query.filter(User.username.in_(['ss_t1', 'ss_a1'])).delete(synchronize_session=False)
+    db.session.commit()
+
+print('Server session test OK')
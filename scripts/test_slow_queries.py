@@ -0,0 +1,67 @@
+import sys, os
+import json
+import logging
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from app import app, db, User, Student, slow_query_log, fingerprint_sql, touches_tables
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['sq_admin'])).delete(synchronize_session=False)
+    db.session.commit()
+
+    assert fingerprint_sql("SELECT * FROM t WHERE a = 'x' AND b IN (?, ?, ?) LIMIT 10") == \
+        fingerprint_sql("SELECT *  FROM t\nWHERE a = 'yy' AND b IN (?) LIMIT 20")
+
+    tables = ('server_session', 'user')
+    assert touches_tables('SELECT user.password FROM user WHERE user.username = ?', tables)
+    assert touches_tables('INSERT INTO server_session (id, data) VALUES (?, ?) ON CONFLICT DO UPDATE', tables)
+    assert not touches_tables('INSERT INTO audit (action, user) VALUES (?, ?)', tables)
+    assert not touches_tables('SELECT * FROM user_stats', tables)
+
+    client = app.test_client()
+    client.post('/register', data={'username': 'sq_admin', 'password': 'p', 'role': 'Admin'}, follow_redirects=True)
+    client.post('/', data={'username': 'sq_admin', 'password': 'p'}, follow_redirects=True)
+
+    # Treat every statement as slow so plans and samples are captured
+    old_threshold = slow_query_log.threshold
+    slow_query_log.reset()
+    slow_query_log.threshold = 0
+    try:
+        for term in ('abc', 'xyz'):
+            client.get('/admin/students', query_string={'q': term})
+        client.post('/', data={'username': 'sq_admin', 'password': 'p'})  # user lookup + session rewrite
+    finally:
+        slow_query_log.threshold = old_threshold
+
+    fps = slow_query_log.fingerprints()
+    listing = [f for f in fps if 'FROM student' in f['fingerprint'] and 'LIKE' in f['fingerprint'].upper()]
+    assert listing, 'Student search queries should be fingerprinted'
+    assert max(f['count'] for f in listing) >= 2, 'Both searches should share a fingerprint'
+    assert any(f['plan'] for f in listing), 'Slow statements should carry a query plan'
+    samples = slow_query_log.slow_samples()
+    assert samples and samples[0]['endpoint'] is not None
+    assert len(samples) <= app.config['SLOW_QUERY_LOG_SIZE']
+    logging.info('Top fingerprint: %s', fps[0])
+
+    r = client.get('/admin/slow-queries')
+    assert r.status_code == 200 and b'Statements by total time' in r.data
+    raw = client.get('/admin/slow-queries?format=json').get_data(as_text=True)
+    dump = json.loads(raw)
+    assert dump['fingerprints'] and dump['slow']
+
+    # Session IDs/payloads and password hashes are never kept as parameters
+    sensitive = [s for s in samples if 'server_session' in s['statement'] or 'FROM user' in s['statement']]
+    assert sensitive and all(s['parameters'] == '<redacted>' for s in sensitive)
+    sid = client.get_cookie('session').value
+    pw_hash = User.query.filter_by(username='sq_admin').first().password
+    assert sid not in raw and pw_hash not in raw
+
+    client.post('/admin/slow-queries/reset')
+    assert not slow_query_log.slow_samples()
+
+    # Cleanup
+    User.query.filter(User.username.in_(['sq_admin'])).delete(synchronize_session=False)
+    db.session.commit()
+
+print('Slow query test OK')
@@ -0,0 +1,66 @@
+import sys, os
+import csv
+import gzip
+import io
+import logging
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from sqlalchemy import insert
+from app import app, db, User, Student, rebuild_student_stats
+
+with app.app_context():
+    db.create_all()
+    # Cleanup
+    User.query.filter(User.username.in_(['se_t1', 'se_t2'])).delete(synchronize_session=False)
+    Student.query.filter(Student.added_by.in_(['se_t1', 'se_t2'])).delete(synchronize_session=False)
+    db.session.commit()
+
+    rows = [{'name': f'Exp{i}', 'section': f'S{i % 4}', 'subject': 'math', 'attendance': 90, 'activities': 80, 'quizzes': 80,
+             'performance_task': 80, 'exam': 80, 'written_works': 80, 'final_grade': 80, 'risk': 'Low Risk',
+             'notes': 'note, with comma', 'added_by': 'se_t1'} for i in range(60000)]
+    rows.append(dict(rows[0], name='NotMine', added_by='se_t2'))
+    db.session.execute(insert(Student), rows)
+    db.session.commit()
+    rebuild_student_stats()
+
+    client = app.test_client()
+    client.post('/register', data={'username': 'se_t1', 'password': 'p', 'role': 'Teacher'}, follow_redirects=True)
+    client.post('/', data={'username': 'se_t1', 'password': 'p'}, follow_redirects=True)
+
+    # Plain CSV, streamed in pieces with only my students
+    client.get('/admin/students/export').get_data()  # warm up query compilation
+    tracemalloc.start()
+    r = client.get('/admin/students/export')
+    assert r.is_streamed and 'Content-Encoding' not in r.headers
+    pieces = 0
+    total = 0
+    for piece in r.response:
+        pieces += 1
+        total += len(piece)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    logging.info('Exported %d bytes in %d pieces, peak traced memory %d bytes', total, pieces, peak)
+    assert pieces > 10, 'Export should be sent incrementally'
+    assert peak < total / 2, 'Export memory should not grow with the number of rows'
+
+    data = list(csv.reader(io.StringIO(client.get('/admin/students/export').get_data(as_text=True))))
+    assert data[0][:3] == ['id', 'name', 'section'] and len(data) == 60001
+    assert all(row[1] != 'NotMine' for row in data[1:])
+    assert data[1][-1] == 'note, with comma'
+
+    # gzip when the client asks for it, unless disabled
+    r = client.get('/admin/students/export', headers={'Accept-Encoding': 'gzip'})
+    assert r.headers.get('Content-Encoding') == 'gzip'
+    unzipped = gzip.decompress(r.get_data()).decode('utf-8')
+    assert unzipped.count('\n') == 60001
+    logging.info('gzip: %d bytes for %d bytes of CSV', len(r.get_data()), len(unzipped))
+    r = client.get('/admin/students/export?gzip=0', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in r.headers
+
+    # Cleanup
+    User.query.filter(User.username.in_(['se_t1', 'se_t2'])).delete(synchronize_session=False)
+    Student.query.filter(Student.added_by.in_(['se_t1', 'se_t2'])).delete(synchronize_session=False)
+    db.session.commit()
+    rebuild_student_stats()
+
+print('Streaming export test OK')